@@ -3,11 +3,12 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from functools import lru_cache
 import os
 from pathlib import Path
 
 
-BASE_DIR = Path(__file__).resolve().parents[1]
+BASE_DIR = Path(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 DATA_DIR = BASE_DIR / "data"
 DB_PATH = BASE_DIR / "studyscribe.db"
 
@@ -17,6 +18,8 @@ class Settings:
     gemini_api_key: str | None
     gemini_model: str
     chunk_seconds: int
+    transcribe_workers: int
+    whisper_compute_type: str | None
 
 
 def load_settings() -> Settings:
@@ -29,14 +32,34 @@ def load_settings() -> Settings:
         ) from exc
     if chunk_seconds <= 0:
         raise ValueError("TRANSCRIBE_CHUNK_SECONDS must be positive")
+    workers_str = os.getenv("TRANSCRIBE_WORKERS", "1")
+    try:
+        transcribe_workers = int(workers_str)
+    except ValueError as exc:
+        raise ValueError(f"TRANSCRIBE_WORKERS must be an integer, got: {workers_str!r}") from exc
+    if transcribe_workers <= 0:
+        raise ValueError("TRANSCRIBE_WORKERS must be positive")
     return Settings(
         gemini_api_key=os.getenv("GEMINI_API_KEY"),
         gemini_model=os.getenv("GEMINI_MODEL", "gemini-2.5-flash"),
         chunk_seconds=chunk_seconds,
+        transcribe_workers=transcribe_workers,
+        # Unset means transcribe.py picks the fastest type for the detected device.
+        whisper_compute_type=os.getenv("WHISPER_COMPUTE_TYPE") or None,
     )
 
 
-settings = load_settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Load settings on first use rather than at import time."""
+    return load_settings()
+
+
+def __getattr__(name: str):
+    # Keep `config.settings` working for templates and older imports.
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def override_paths(data_dir: Path | None = None, db_path: Path | None = None) -> None:
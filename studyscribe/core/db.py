@@ -3,14 +3,17 @@
 from __future__ import annotations
 
 import logging
+import os
 import sqlite3
-from contextlib import closing
-from typing import Iterable
+import threading
+from contextlib import contextmanager
+from typing import Iterable, Iterator
 
-from .config import DB_PATH
+from . import config
 
 
 _LOGGER = logging.getLogger(__name__)
+_LOCAL = threading.local()
 
 SCHEMA: Iterable[str] = (
     """
@@ -79,54 +82,316 @@ SCHEMA: Iterable[str] = (
         session_name TEXT,
         url TEXT,
         source_json TEXT,
+        title TEXT,
+        excerpt TEXT,
+        open_url TEXT,
+        locator_json TEXT,
         FOREIGN KEY(message_id) REFERENCES ai_messages(id)
     );
     """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_ai_sources_lookup
+        ON ai_message_sources(source_id, id DESC, message_id);
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_ai_messages_session ON ai_messages(session_id, id);
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_ai_sources_message ON ai_message_sources(message_id, id);
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_sessions_module ON sessions(module_id, created_at);
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_modules_created ON modules(created_at);
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS session_notes (
+        session_id TEXT PRIMARY KEY,
+        notes_html TEXT NOT NULL DEFAULT '',
+        notes_markdown TEXT NOT NULL DEFAULT '',
+        notes_plain TEXT NOT NULL DEFAULT '',
+        session_tags_json TEXT NOT NULL DEFAULT '[]',
+        FOREIGN KEY(session_id) REFERENCES sessions(id)
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS session_segment_tags (
+        session_id TEXT NOT NULL,
+        segment_id TEXT NOT NULL,
+        label TEXT NOT NULL,
+        PRIMARY KEY(session_id, segment_id, label),
+        FOREIGN KEY(session_id) REFERENCES sessions(id)
+    );
+    """,
+    """
+    CREATE VIEW IF NOT EXISTS session_annotations AS
+    SELECT
+        s.id AS session_id,
+        json_object(
+            'notes', COALESCE(n.notes_plain, ''),
+            'notes_html', COALESCE(n.notes_html, ''),
+            'notes_markdown', COALESCE(n.notes_markdown, ''),
+            'session_tags', json(COALESCE(n.session_tags_json, '[]')),
+            'tags', (
+                SELECT json_group_object(segment_id, json(labels))
+                FROM (
+                    SELECT segment_id, json_group_array(label) AS labels
+                    FROM session_segment_tags
+                    WHERE session_id = s.id
+                    GROUP BY segment_id
+                )
+            )
+        ) AS annotations_json
+    FROM sessions s
+    LEFT JOIN session_notes n ON n.session_id = s.id;
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS attachment_sources (
+        id INTEGER PRIMARY KEY,
+        session_id TEXT NOT NULL,
+        source_id TEXT,
+        file_name TEXT,
+        mime TEXT,
+        page INTEGER,
+        slide INTEGER,
+        text TEXT NOT NULL DEFAULT ''
+    );
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_attachment_sources_session
+    ON attachment_sources(session_id, file_name);
+    """,
+    # External-content FTS: only the text is indexed; session filtering and
+    # deletes go through attachment_sources and its index, joined by rowid.
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS attachment_fts USING fts5(
+        text,
+        content = 'attachment_sources',
+        content_rowid = 'id',
+        tokenize = 'porter unicode61'
+    );
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS attachment_sources_ai AFTER INSERT ON attachment_sources BEGIN
+        INSERT INTO attachment_fts (rowid, text) VALUES (new.id, new.text);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS attachment_sources_ad AFTER DELETE ON attachment_sources BEGIN
+        INSERT INTO attachment_fts (attachment_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS attachment_sources_au AFTER UPDATE ON attachment_sources BEGIN
+        INSERT INTO attachment_fts (attachment_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        INSERT INTO attachment_fts (rowid, text) VALUES (new.id, new.text);
+    END;
+    """,
+    # Sessions whose attachments have been indexed at least once, including
+    # sessions with none, so the legacy extracted_sources.json backfill runs once.
+    """
+    CREATE TABLE IF NOT EXISTS attachment_indexed_sessions (
+        session_id TEXT PRIMARY KEY
+    );
+    """,
+)
+
+
+# Per-connection settings. synchronous=NORMAL only fsyncs at checkpoints, which
+# is safe under WAL; journal_mode itself is persistent and set once in init_db().
+_CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA cache_size = -65536",
 )
 
 
 def get_connection() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH, timeout=5.0)
+    """Open a new, fully configured connection to the current DB_PATH."""
+    conn = sqlite3.connect(config.DB_PATH, timeout=5.0, cached_statements=256)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON")
     try:
-        # Improve SQLite write concurrency for local single-instance use.
-        conn.execute("PRAGMA journal_mode = WAL")
-        conn.execute("PRAGMA busy_timeout = 5000")
+        for pragma in _CONNECTION_PRAGMAS:
+            conn.execute(pragma)
     except sqlite3.OperationalError as exc:
         _LOGGER.warning("SQLite PRAGMA setup failed: %s", exc)
     return conn
 
 
+def _thread_connection() -> sqlite3.Connection:
+    """This thread's long-lived connection; reopened if DB_PATH changes or after fork."""
+    key = (os.getpid(), config.DB_PATH)
+    cached = getattr(_LOCAL, "handle", None)
+    if cached is not None:
+        if cached[0] == key:
+            return cached[1]
+        if cached[0][0] == key[0]:
+            cached[1].close()
+        # A handle inherited across fork belongs to the parent; never touch it here.
+    conn = get_connection()
+    _LOCAL.handle = (key, conn)
+    return conn
+
+
+def close_connection() -> None:
+    """Close the calling thread's cached connection, if any."""
+    cached = getattr(_LOCAL, "handle", None)
+    _LOCAL.handle = None
+    if cached is not None and cached[0][0] == os.getpid():
+        cached[1].close()
+
+
+@contextmanager
+def _connection(*, commit: bool = False) -> Iterator[sqlite3.Connection]:
+    active = getattr(_LOCAL, "conn", None)
+    if active is not None:
+        # Inside transaction(): share its connection and leave the commit to it.
+        yield active
+        return
+    conn = _thread_connection()
+    try:
+        yield conn
+    except BaseException:
+        # The handle outlives this call, so never leave an implicit transaction open.
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    if commit:
+        conn.commit()
+
+
+@contextmanager
+def transaction() -> Iterator[sqlite3.Connection]:
+    """Run the enclosed helpers in one transaction; nested calls use SAVEPOINTs."""
+    active = getattr(_LOCAL, "conn", None)
+    if active is not None:
+        _LOCAL.depth += 1
+        savepoint = f"sp_{_LOCAL.depth}"
+        active.execute(f"SAVEPOINT {savepoint}")
+        try:
+            yield active
+        except BaseException:
+            active.execute(f"ROLLBACK TO {savepoint}")
+            active.execute(f"RELEASE {savepoint}")
+            raise
+        else:
+            active.execute(f"RELEASE {savepoint}")
+        finally:
+            _LOCAL.depth -= 1
+        return
+    conn = _thread_connection()
+    conn.execute("BEGIN IMMEDIATE")
+    _LOCAL.conn = conn
+    _LOCAL.depth = 0
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    else:
+        conn.commit()
+    finally:
+        _LOCAL.conn = None
+
+
+# Columns added after the first release: (table, column, type).
+_ADDED_COLUMNS = (
+    ("ai_message_sources", "title", "TEXT"),
+    ("ai_message_sources", "excerpt", "TEXT"),
+    ("ai_message_sources", "open_url", "TEXT"),
+    ("ai_message_sources", "locator_json", "TEXT"),
+)
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    added = False
+    for table, column, column_type in _ADDED_COLUMNS:
+        existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if column not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+            added = True
+    if added:
+        # One-shot backfill of the promoted preview fields from the JSON blob.
+        conn.execute(
+            """
+            UPDATE ai_message_sources SET
+                title = json_extract(source_json, '$.title'),
+                excerpt = json_extract(source_json, '$.excerpt'),
+                open_url = json_extract(source_json, '$.open_url'),
+                locator_json = json_extract(source_json, '$.locator')
+            WHERE source_json IS NOT NULL AND json_valid(source_json)
+            """
+        )
+
+
 def init_db() -> None:
-    with closing(get_connection()) as conn:
+    # WAL lets readers run alongside the writer; it is stored in the file, so once is enough.
+    _thread_connection().execute("PRAGMA journal_mode = WAL")
+    # sqlite3 autocommits DDL; one explicit transaction makes the schema a single commit.
+    with transaction() as conn:
         for statement in SCHEMA:
             conn.execute(statement)
-        conn.commit()
+        _migrate(conn)
 
 
 def execute(query: str, params: tuple | list = ()) -> None:
-    with closing(get_connection()) as conn:
+    with _connection(commit=True) as conn:
         conn.execute(query, params)
-        conn.commit()
+
+
+def execute_many(query: str, rows: Iterable[tuple | list]) -> None:
+    with _connection(commit=True) as conn:
+        conn.executemany(query, rows)
 
 
 def execute_returning_id(query: str, params: tuple | list = ()) -> int:
-    with closing(get_connection()) as conn:
+    with _connection(commit=True) as conn:
         cursor = conn.execute(query, params)
-        conn.commit()
         if cursor.lastrowid is None:
             raise ValueError("No row was inserted; cannot return lastrowid")
         return int(cursor.lastrowid)
 
 
 def fetch_one(query: str, params: tuple | list = ()) -> sqlite3.Row | None:
-    with closing(get_connection()) as conn:
+    with _connection() as conn:
         cursor = conn.execute(query, params)
-        return cursor.fetchone()
+        row = cursor.fetchone()
+        # Reset the statement now so the shared handle holds no read snapshot.
+        cursor.close()
+        return row
 
 
 def fetch_all(query: str, params: tuple | list = ()) -> list[sqlite3.Row]:
-    with closing(get_connection()) as conn:
+    with _connection() as conn:
         cursor = conn.execute(query, params)
         return list(cursor.fetchall())
+
+
+# Fixed SQL text for the per-request lookups, so the statement cache always hits.
+# Explicit column lists keep rows small if the tables ever grow wider.
+_MODULE_BY_ID = "SELECT id, name, created_at FROM modules WHERE id = ?"
+_SESSION_BY_ID = "SELECT id, module_id, name, created_at FROM sessions WHERE id = ?"
+_SESSION_IN_MODULE = "SELECT id, module_id, name, created_at FROM sessions WHERE id = ? AND module_id = ?"
+# Session row plus its module's name, replacing a second modules lookup.
+_SESSION_WITH_MODULE = (
+    "SELECT s.id, s.module_id, s.name, s.created_at, m.name AS module_name"
+    " FROM sessions s JOIN modules m ON m.id = s.module_id WHERE s.id = ?"
+)
+
+
+def get_module(module_id: str) -> sqlite3.Row | None:
+    return fetch_one(_MODULE_BY_ID, (module_id,))
+
+
+def get_session(session_id: str, module_id: str | None = None) -> sqlite3.Row | None:
+    if module_id is None:
+        return fetch_one(_SESSION_BY_ID, (session_id,))
+    return fetch_one(_SESSION_IN_MODULE, (session_id, module_id))
+
+
+def get_session_with_module(session_id: str) -> sqlite3.Row | None:
+    return fetch_one(_SESSION_WITH_MODULE, (session_id,))
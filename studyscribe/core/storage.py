@@ -2,10 +2,13 @@
 
 from __future__ import annotations
 
+from functools import lru_cache
 import logging
 import os
 import shutil
+import time
 from pathlib import Path
+from typing import Any
 
 
 _LOGGER = logging.getLogger(__name__)
@@ -13,6 +16,11 @@ _DEFAULT_MIN_FREE_PERCENT = 5.0
 _DEFAULT_MIN_FREE_MB = 0
 _DEFAULT_WARN_PERCENT = 80.0
 _WARNED_USAGE = False
+# disk_usage results per device, reused briefly unless free space is near the limit.
+_USAGE_TTL_SECONDS = 5.0
+_USAGE_CACHE: dict[int, tuple[float, Any]] = {}
+# Uploads not already on disk are copied in 1 MB blocks, not Werkzeug's 16 KB default.
+UPLOAD_COPY_BUFFER = 1024 * 1024
 
 
 class StorageError(RuntimeError):
@@ -63,9 +71,8 @@ def _parse_env_int(name: str, default: int) -> int:
     return value
 
 
-def check_disk_space(path: Path) -> None:
-    """Raise StorageError when disk space falls below configured thresholds."""
-    global _WARNED_USAGE
+@lru_cache(maxsize=1)
+def _thresholds() -> tuple[float, int, float]:
     # Thresholds are environment-tunable to match deployment storage constraints.
     min_free_percent = _parse_env_float("DATA_DIR_MIN_FREE_PERCENT", _DEFAULT_MIN_FREE_PERCENT)
     min_free_mb = _parse_env_int("DATA_DIR_MIN_FREE_MB", _DEFAULT_MIN_FREE_MB)
@@ -73,8 +80,30 @@ def check_disk_space(path: Path) -> None:
     if min_free_percent <= 0 and min_free_mb <= 0:
         min_free_percent = 0.0
         min_free_mb = 0
+    return min_free_percent, min_free_mb, warn_percent
+
+
+def _disk_usage(path: Path, min_free_percent: float, min_free_mb: int):
+    device = os.stat(path).st_dev
+    now = time.monotonic()
+    cached = _USAGE_CACHE.get(device)
+    if cached is not None and now - cached[0] < _USAGE_TTL_SECONDS:
+        usage = cached[1]
+        floor_bytes = max(min_free_mb * 1024 * 1024, usage.total * min_free_percent / 100)
+        # Close to the limit every write re-checks, so the cache never hides a full disk.
+        if usage.free > floor_bytes * 1.2:
+            return usage
+    usage = shutil.disk_usage(path)
+    _USAGE_CACHE[device] = (now, usage)
+    return usage
+
+
+def check_disk_space(path: Path) -> None:
+    """Raise StorageError when disk space falls below configured thresholds."""
+    global _WARNED_USAGE
+    min_free_percent, min_free_mb, warn_percent = _thresholds()
     try:
-        usage = shutil.disk_usage(path)
+        usage = _disk_usage(path, min_free_percent, min_free_mb)
     except FileNotFoundError:
         return
     free_mb = usage.free / (1024 * 1024)
@@ -2,10 +2,11 @@
 
 from __future__ import annotations
 
+import os
 from pathlib import Path
 from werkzeug.utils import secure_filename
 
-from studyscribe.core.storage import check_disk_space, ensure_private_dir
+from studyscribe.core.storage import UPLOAD_COPY_BUFFER, check_disk_space, ensure_private_dir
 
 
 def save_audio(file_storage, session_dir: Path) -> Path:
@@ -14,5 +15,11 @@ def save_audio(file_storage, session_dir: Path) -> Path:
     check_disk_space(session_dir)
     filename = secure_filename(file_storage.filename or "") or "audio"
     dest = audio_dir / filename
-    file_storage.save(dest)
+    spooled = getattr(file_storage.stream, "name", None)
+    if isinstance(spooled, str) and Path(spooled).parent == audio_dir:
+        # The request already spooled the body into audio/; move it rather than copy it.
+        file_storage.stream.flush()
+        os.replace(spooled, dest)
+        return dest
+    file_storage.save(dest, buffer_size=UPLOAD_COPY_BUFFER)
     return dest
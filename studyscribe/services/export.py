@@ -2,22 +2,32 @@
 
 from __future__ import annotations
 
-import json
-import re
+import os
+import string
+import sys
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Iterable
-from zipfile import ZIP_DEFLATED, ZipFile
+from typing import Iterable, Iterator
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile, ZipInfo
 
-from studyscribe.core.config import settings
+import orjson
+
+from studyscribe.core import db
+from studyscribe.core.config import get_settings
 
 
 ALLOWED_AUDIO_EXTENSIONS = {".wav", ".mp3", ".m4a", ".aac", ".flac", ".ogg"}
 ALLOWED_ATTACHMENT_EXTENSIONS = {".pdf", ".ppt", ".pptx", ".doc", ".docx"}
+# Tuples for str.endswith, which checks every suffix in one C call.
+_AUDIO_SUFFIXES = tuple(ALLOWED_AUDIO_EXTENSIONS)
+_ATTACHMENT_SUFFIXES = tuple(ALLOWED_ATTACHMENT_EXTENSIONS)
+
+
+_UTC = timezone.utc
 
 
 def _now_iso() -> str:
-    return datetime.now(timezone.utc).isoformat()
+    return datetime.now(_UTC).isoformat(timespec="seconds")
 
 
 def _safe_name(value: str | None, fallback: str) -> str:
@@ -28,15 +38,120 @@ def _safe_name(value: str | None, fallback: str) -> str:
     return safe or fallback
 
 
+class _UnsafeToSeparator(dict):
+    """str.translate table: allowed characters map to themselves, anything else to NUL."""
+
+    _ALLOWED = frozenset(map(ord, string.ascii_letters + string.digits + "._-"))
+
+    def __missing__(self, codepoint: int) -> str:
+        value = chr(codepoint) if codepoint in self._ALLOWED else "\0"
+        self[codepoint] = value
+        return value
+
+
+_FILENAME_TABLE = _UnsafeToSeparator()
+
+
 def _safe_filename_component(value: str) -> str:
-    safe = re.sub(r"[^A-Za-z0-9._-]+", "_", value)
+    # Splitting on NUL and dropping empties collapses each unsafe run into one "_".
+    safe = "_".join(filter(None, value.translate(_FILENAME_TABLE).split("\0")))
     safe = safe.strip("._")
     return safe or "export"
 
 
-def _write_zip_file(zip_file: ZipFile, src: Path, dest: str, files: list[str]) -> None:
-    zip_file.write(src, dest)
+# Formats that are already compressed; deflating them again only burns CPU.
+STORED_EXTENSIONS = {".wav", ".mp3", ".m4a", ".aac", ".flac", ".ogg", ".pdf", ".pptx", ".docx"}
+_STORED_SUFFIXES = tuple(STORED_EXTENSIONS)
+# Text entries are small; the fastest zlib level keeps the export I/O-bound.
+_DEFLATE_LEVEL = 1
+_COPY_CHUNK_SIZE = 1024 * 1024
+# Response pieces are coalesced to this size so the server issues few, large writes.
+_STREAM_FLUSH_BYTES = 4 * 1024 * 1024
+
+
+class _ChunkSink:
+    """Write-only, non-seekable file object that buffers bytes until drained."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _scan_files(directory: Path, suffixes: tuple[str, ...]) -> list[os.DirEntry]:
+    """Regular files ending in one of ``suffixes``; DirEntry.is_file needs no extra stat."""
+    try:
+        entries = os.scandir(directory)
+    except FileNotFoundError:
+        return []
+    with entries:
+        return [
+            entry
+            for entry in entries
+            if entry.is_file(follow_symlinks=False) and entry.name.lower().endswith(suffixes)
+        ]
+
+
+def _coalesce(chunks: Iterable[bytes], min_size: int) -> Iterator[bytes]:
+    pending: list[bytes] = []
+    size = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        pending.append(chunk)
+        size += len(chunk)
+        if size >= min_size:
+            yield b"".join(pending)
+            pending.clear()
+            size = 0
+    if pending:
+        yield b"".join(pending)
+
+
+def _set_compress_level(info: ZipInfo, level: int) -> None:
+    # A ZipInfo built with from_file() (to keep the source mtime and mode) does
+    # not inherit the archive's compresslevel, and ZipFile.open() takes no level
+    # argument. Python 3.13 exposes the attribute as compress_level; older
+    # versions only have the private _compresslevel.
+    if sys.version_info >= (3, 13):
+        info.compress_level = level
+    else:
+        info._compresslevel = level
+
+
+def _write_zip_file(
+    zip_file: ZipFile, sink: _ChunkSink, src: str | Path, dest: str, files: list[str]
+) -> Iterator[bytes]:
+    info = ZipInfo.from_file(src, dest)
+    if dest.lower().endswith(_STORED_SUFFIXES):
+        info.compress_type = ZIP_STORED
+    else:
+        info.compress_type = ZIP_DEFLATED
+        _set_compress_level(info, _DEFLATE_LEVEL)
+    with open(src, "rb") as source, zip_file.open(info, "w") as target:
+        while chunk := source.read(_COPY_CHUNK_SIZE):
+            target.write(chunk)
+            yield sink.drain()
     files.append(dest)
+    yield sink.drain()
+
+
+def _write_zip_text(
+    zip_file: ZipFile, sink: _ChunkSink, text: str | bytes, dest: str, files: list[str]
+) -> bytes:
+    zip_file.writestr(dest, text, compress_type=ZIP_DEFLATED)
+    files.append(dest)
+    return sink.drain()
 
 
 def build_session_export(
@@ -51,107 +166,104 @@ def build_session_export(
     include_attachments: bool,
     include_raw_chunks: bool,
     include_prompt_manifest: bool,
-) -> Path:
-    exports_dir = session_dir / "exports"
-    exports_dir.mkdir(parents=True, exist_ok=True)
-
+) -> tuple[str, Iterator[bytes]]:
+    """Return the download filename and a generator streaming the ZIP bytes."""
     safe_module = _safe_name(module.get("name"), "Module")
     safe_session = _safe_name(session.get("name"), "Session")
-    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    timestamp = datetime.now(_UTC).strftime("%Y%m%d-%H%M%S")
     filename = _safe_filename_component(f"StudyScribe_{safe_module}_{safe_session}_{timestamp}.zip")
-    zip_path = exports_dir / filename
     root = f"StudyScribe/{safe_module}/{safe_session}"
 
-    files: list[str] = []
-
-    with ZipFile(zip_path, "w", compression=ZIP_DEFLATED) as zip_file:
-        if include_ai_notes:
-            notes_path = session_dir / "notes" / "ai_notes.md"
-            if notes_path.exists():
-                _write_zip_file(zip_file, notes_path, f"{root}/ai_notes.md", files)
-
-        if include_personal_notes:
-            annotations_path = session_dir / "annotations.json"
-            notes_html = None
-            notes_markdown = None
-            notes_plain = None
-            if annotations_path.exists():
-                data = json.loads(annotations_path.read_text(encoding="utf-8"))
-                notes_html = data.get("notes_html") or None
-                notes_markdown = data.get("notes_markdown") or None
-                notes_plain = data.get("notes") or None
-            if notes_markdown:
-                markdown_path = session_dir / "notes" / "personal_notes.md"
-                markdown_path.write_text(notes_markdown, encoding="utf-8")
-                _write_zip_file(zip_file, markdown_path, f"{root}/personal_notes.md", files)
-            elif notes_plain:
-                markdown_path = session_dir / "notes" / "personal_notes.md"
-                markdown_path.write_text(notes_plain, encoding="utf-8")
-                _write_zip_file(zip_file, markdown_path, f"{root}/personal_notes.md", files)
-            if notes_html:
-                html_path = session_dir / "notes" / "personal_notes.html"
-                html_path.write_text(notes_html, encoding="utf-8")
-                _write_zip_file(zip_file, html_path, f"{root}/personal_notes.html", files)
-
-        if include_transcript:
-            transcript_txt = session_dir / "transcript" / "transcript.txt"
-            if transcript_txt.exists():
-                _write_zip_file(zip_file, transcript_txt, f"{root}/transcript.txt", files)
-
-        if include_audio:
-            audio_dir = session_dir / "audio"
-            if audio_dir.exists():
-                for path in audio_dir.iterdir():
-                    if path.is_file() and path.suffix.lower() in ALLOWED_AUDIO_EXTENSIONS:
-                        _write_zip_file(zip_file, path, f"{root}/audio/{path.name}", files)
-
-        if include_attachments:
-            attachments_dir = session_dir / "attachments"
-            if attachments_dir.exists():
-                for path in attachments_dir.iterdir():
-                    if not path.is_file():
-                        continue
-                    if path.name in {"extracted.txt", "extracted_sources.json"}:
-                        continue
-                    if path.suffix.lower() not in ALLOWED_ATTACHMENT_EXTENSIONS:
-                        continue
-                    _write_zip_file(zip_file, path, f"{root}/attachments/{path.name}", files)
-
-        if include_raw_chunks:
-            chunks_path = session_dir / "transcript" / "chunks.json"
-            if chunks_path.exists():
-                _write_zip_file(zip_file, chunks_path, f"{root}/raw/chunks.json", files)
-
-        if include_prompt_manifest:
-            manifest_path = session_dir / "notes" / "prompt_manifest.json"
-            manifest_payload = {
+    def _stream() -> Iterator[bytes]:
+        files: list[str] = []
+        sink = _ChunkSink()
+        # The archive is written straight into the response; nothing is staged on disk.
+        with ZipFile(sink, "w", compression=ZIP_DEFLATED, compresslevel=_DEFLATE_LEVEL) as zip_file:
+            if include_ai_notes:
+                notes_path = session_dir / "notes" / "ai_notes.md"
+                if notes_path.exists():
+                    yield from _write_zip_file(zip_file, sink, notes_path, f"{root}/ai_notes.md", files)
+
+            if include_personal_notes:
+                row = db.fetch_one(
+                    "SELECT annotations_json FROM session_annotations WHERE session_id = ?",
+                    (session.get("id"),),
+                )
+                notes_html = None
+                notes_markdown = None
+                notes_plain = None
+                if row is not None:
+                    data = orjson.loads(row["annotations_json"])
+                    notes_html = data.get("notes_html") or None
+                    notes_markdown = data.get("notes_markdown") or None
+                    notes_plain = data.get("notes") or None
+                if notes_markdown or notes_plain:
+                    yield _write_zip_text(
+                        zip_file, sink, notes_markdown or notes_plain, f"{root}/personal_notes.md", files
+                    )
+                if notes_html:
+                    yield _write_zip_text(zip_file, sink, notes_html, f"{root}/personal_notes.html", files)
+
+            if include_transcript:
+                transcript_txt = session_dir / "transcript" / "transcript.txt"
+                if transcript_txt.exists():
+                    yield from _write_zip_file(zip_file, sink, transcript_txt, f"{root}/transcript.txt", files)
+
+            if include_audio:
+                for entry in _scan_files(session_dir / "audio", _AUDIO_SUFFIXES):
+                    yield from _write_zip_file(zip_file, sink, entry.path, f"{root}/audio/{entry.name}", files)
+
+            if include_attachments:
+                # Derived files (extracted.txt, caches) never match the attachment suffixes.
+                for entry in _scan_files(session_dir / "attachments", _ATTACHMENT_SUFFIXES):
+                    yield from _write_zip_file(
+                        zip_file, sink, entry.path, f"{root}/attachments/{entry.name}", files
+                    )
+
+            if include_raw_chunks:
+                chunks_path = session_dir / "transcript" / "chunks.json"
+                if chunks_path.exists():
+                    yield from _write_zip_file(zip_file, sink, chunks_path, f"{root}/raw/chunks.json", files)
+
+            if include_prompt_manifest:
+                manifest_payload = {
+                    "exported_at": _now_iso(),
+                    "meta": {"model": get_settings().gemini_model},
+                }
+                try:
+                    manifest_payload["last_answer"] = orjson.loads(
+                        (session_dir / "notes" / "last_answer.json").read_bytes()
+                    )
+                except FileNotFoundError:
+                    pass
+                yield _write_zip_text(
+                    zip_file,
+                    sink,
+                    orjson.dumps(manifest_payload, option=orjson.OPT_INDENT_2),
+                    f"{root}/prompt_manifest.json",
+                    files,
+                )
+
+            # Manifest captures export metadata and the final file list for reproducibility.
+            manifest = {
+                "module": {"id": module.get("id"), "name": module.get("name")},
+                "session": {"id": session.get("id"), "name": session.get("name")},
                 "exported_at": _now_iso(),
-                "meta": {"model": settings.gemini_model},
+                "included": {
+                    "include_ai_notes": include_ai_notes,
+                    "include_personal_notes": include_personal_notes,
+                    "include_transcript": include_transcript,
+                    "include_audio": include_audio,
+                    "include_attachments": include_attachments,
+                    "include_raw_chunks": include_raw_chunks,
+                    "include_prompt_manifest": include_prompt_manifest,
+                },
+                "files": sorted(files + [f"{root}/manifest.json"]),
             }
-            last_answer = session_dir / "notes" / "last_answer.json"
-            if last_answer.exists():
-                manifest_payload["last_answer"] = json.loads(last_answer.read_text(encoding="utf-8"))
-            manifest_path.write_text(json.dumps(manifest_payload, indent=2), encoding="utf-8")
-            _write_zip_file(zip_file, manifest_path, f"{root}/prompt_manifest.json", files)
-
-        # Manifest captures export metadata and the final file list for reproducibility.
-        manifest = {
-            "module": {"id": module.get("id"), "name": module.get("name")},
-            "session": {"id": session.get("id"), "name": session.get("name")},
-            "exported_at": _now_iso(),
-            "included": {
-                "include_ai_notes": include_ai_notes,
-                "include_personal_notes": include_personal_notes,
-                "include_transcript": include_transcript,
-                "include_audio": include_audio,
-                "include_attachments": include_attachments,
-                "include_raw_chunks": include_raw_chunks,
-                "include_prompt_manifest": include_prompt_manifest,
-            },
-            "files": sorted(files + [f"{root}/manifest.json"]),
-        }
-        manifest_path = session_dir / "exports" / "manifest.json"
-        manifest_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
-        _write_zip_file(zip_file, manifest_path, f"{root}/manifest.json", files)
-
-    return zip_path
+            yield _write_zip_text(
+                zip_file, sink, orjson.dumps(manifest, option=orjson.OPT_INDENT_2), f"{root}/manifest.json", files
+            )
+        # Closing the archive writes the central directory.
+        yield sink.drain()
+
+    return filename, _coalesce(_stream(), _STREAM_FLUSH_BYTES)
@@ -2,16 +2,18 @@
 
 from __future__ import annotations
 
-import json
 import logging
 import os
+from functools import lru_cache
 import random
+import threading
 import time
 from typing import Any
 
+import orjson
 from pydantic import BaseModel, ValidationError
 
-from studyscribe.core.config import settings
+from studyscribe.core.config import get_settings
 
 
 class GeminiError(RuntimeError):
@@ -34,8 +36,15 @@ class AnswerOutput(BaseModel):
 
 _LOGGER = logging.getLogger(__name__)
 _RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# Client errors that a retry cannot fix, even if the message mentions quota.
+_FATAL_STATUS = {400, 401, 403, 404}
+_MAX_BACKOFF_SECONDS = 10.0
+# One client per API key, so its HTTP connection pool is reused across calls.
+_CLIENT_LOCK = threading.Lock()
+_CLIENT: tuple[str, Any] | None = None
 
 
+@lru_cache(maxsize=1)
 def _retry_settings() -> tuple[int, float]:
     raw_attempts = os.getenv("GEMINI_MAX_RETRIES", "3")
     raw_base = os.getenv("GEMINI_RETRY_BASE_SECONDS", "1.0")
@@ -62,8 +71,17 @@ def _extract_status(exc: Exception) -> int | None:
     return None
 
 
+@lru_cache(maxsize=1)
+def _backoff_schedule() -> tuple[float, ...]:
+    """Capped exponential delays before each retry; jitter is added per attempt."""
+    max_attempts, base_delay = _retry_settings()
+    return tuple(min(base_delay * 2**index, _MAX_BACKOFF_SECONDS) for index in range(max_attempts))
+
+
 def _is_retryable(exc: Exception) -> bool:
     status = _extract_status(exc)
+    if status in _FATAL_STATUS:
+        return False
     if status in _RETRYABLE_STATUS:
         return True
     message = str(exc).lower()
@@ -75,10 +93,11 @@ def _is_retryable(exc: Exception) -> bool:
 def _generate_content(prompt: str) -> str:
     client = _client()
     max_attempts, base_delay = _retry_settings()
+    backoffs = _backoff_schedule()
     for attempt in range(1, max_attempts + 1):
         try:
             response = client.models.generate_content(
-                model=settings.gemini_model,
+                model=get_settings().gemini_model,
                 contents=prompt,
             )
             return response.text or ""
@@ -87,7 +106,7 @@ def _generate_content(prompt: str) -> str:
             status = _extract_status(exc)
             if retryable and attempt < max_attempts:
                 # Exponential backoff with jitter to reduce thundering herds on 429/5xx.
-                delay = base_delay * (2 ** (attempt - 1)) + random.uniform(0, base_delay)
+                delay = backoffs[attempt - 1] + random.random() * base_delay
                 _LOGGER.warning(
                     "Gemini API error (status=%s, attempt %s/%s). Retrying in %.1fs: %s",
                     status,
@@ -107,22 +126,38 @@ def _generate_content(prompt: str) -> str:
     raise GeminiError("Gemini API request failed.", user_message="AI request failed. Please try again.")
 
 def _client():
-    if not settings.gemini_api_key:
+    global _CLIENT
+    api_key = get_settings().gemini_api_key
+    if not api_key:
         raise GeminiError(
             "Missing GEMINI_API_KEY",
             user_message="GEMINI_API_KEY is not set. Add it to enable AI features.",
         )
-    try:
-        from google import genai  # type: ignore
-    except ImportError as exc:
-        raise GeminiError(
-            "google-genai package not installed",
-            user_message="Gemini SDK is not installed. Install google-genai to enable AI features.",
-        ) from exc
-    return genai.Client(api_key=settings.gemini_api_key)
+    cached = _CLIENT
+    if cached is not None and cached[0] == api_key:
+        return cached[1]
+    with _CLIENT_LOCK:
+        if _CLIENT is not None and _CLIENT[0] == api_key:
+            return _CLIENT[1]
+        try:
+            # Imported lazily: the SDK is optional and slow to import.
+            from google import genai  # type: ignore
+        except ImportError as exc:
+            raise GeminiError(
+                "google-genai package not installed",
+                user_message="Gemini SDK is not installed. Install google-genai to enable AI features.",
+            ) from exc
+        client = genai.Client(api_key=api_key)
+        _CLIENT = (api_key, client)
+        return client
 
 
 def _extract_json(text: str) -> dict[str, Any]:
+    try:
+        # Happy path: the model returned bare JSON, so skip the fence/brace scans.
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        pass
     raw = text.strip()
     if "```" in raw:
         fence_start = raw.find("```")
@@ -132,15 +167,15 @@ def _extract_json(text: str) -> dict[str, Any]:
             if raw.lower().startswith("json"):
                 raw = raw[4:].strip()
     try:
-        return json.loads(raw)
-    except json.JSONDecodeError:
+        return orjson.loads(raw)
+    except orjson.JSONDecodeError:
         start = raw.find("{")
         end = raw.rfind("}")
         if start != -1 and end != -1 and end > start:
             candidate = raw[start : end + 1]
             try:
-                return json.loads(candidate)
-            except json.JSONDecodeError as exc:
+                return orjson.loads(candidate)
+            except orjson.JSONDecodeError as exc:
                 raise GeminiError(
                     "Model returned invalid JSON.", user_message="AI response was invalid."
                 ) from exc
@@ -7,6 +7,8 @@ from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 import logging
 import os
+import threading
+import time
 import traceback
 from typing import Callable, Any
 from uuid import uuid4
@@ -17,6 +19,9 @@ from studyscribe.core import db
 _LOGGER = logging.getLogger(__name__)
 
 RUN_JOBS_INLINE = False
+# Progress ticks are written only when they move this much, change message, or go stale.
+_PROGRESS_MIN_STEP = 5
+_PROGRESS_MIN_INTERVAL = 0.5
 
 
 def _resolve_max_workers() -> int:
@@ -29,16 +34,44 @@ def _resolve_max_workers() -> int:
     return max(1, value)
 
 
-_EXECUTOR = ThreadPoolExecutor(max_workers=_resolve_max_workers())
+class JobQueueFull(RuntimeError):
+    def __init__(self, message: str, user_message: str | None = None) -> None:
+        super().__init__(message)
+        self.user_message = user_message or message
 
 
-def _warn_if_queue_deep() -> None:
+def _resolve_queue_max() -> int:
+    raw = os.getenv("JOBS_QUEUE_MAX", "32")
+    try:
+        value = int(raw)
+    except ValueError:
+        _LOGGER.warning("Invalid JOBS_QUEUE_MAX=%r; falling back to 32", raw)
+        return 32
+    return max(0, value)
+
+
+_MAX_WORKERS = _resolve_max_workers()
+_EXECUTOR = ThreadPoolExecutor(max_workers=_MAX_WORKERS)
+# Running plus waiting jobs; past this, enqueue_job refuses work instead of queueing it.
+_QUEUE_MAX = _resolve_queue_max()
+_SLOTS = threading.BoundedSemaphore(_MAX_WORKERS + _QUEUE_MAX) if _QUEUE_MAX else None
+
+
+def _resolve_queue_warn() -> int:
     raw = os.getenv("JOBS_QUEUE_WARN", "0")
     try:
-        threshold = int(raw)
+        return max(0, int(raw))
     except ValueError:
         _LOGGER.warning("Invalid JOBS_QUEUE_WARN=%r; disabling queue warnings", raw)
-        return
+        return 0
+
+
+# Parsed once, like the worker count; the environment does not change at runtime.
+_QUEUE_WARN = _resolve_queue_warn()
+
+
+def _warn_if_queue_deep() -> None:
+    threshold = _QUEUE_WARN
     if threshold <= 0:
         return
     queue = getattr(_EXECUTOR, "_work_queue", None)
@@ -60,12 +93,23 @@ def _shutdown_executor() -> None:
 atexit.register(_shutdown_executor)
 
 
+_UTC = timezone.utc
+# (epoch second, formatted) — progress ticks within one second share the string.
+_LAST_STAMP: tuple[int, str] = (0, "")
+
+
 def _now_iso() -> str:
-    return datetime.now(timezone.utc).isoformat()
+    global _LAST_STAMP
+    second = int(time.time())
+    cached = _LAST_STAMP
+    if cached[0] != second:
+        cached = (second, datetime.fromtimestamp(second, _UTC).isoformat())
+        _LAST_STAMP = cached
+    return cached[1]
 
 
 def create_job(message: str | None = None) -> str:
-    job_id = str(uuid4())
+    job_id = uuid4().hex
     now = _now_iso()
     db.execute(
         """
@@ -105,6 +149,14 @@ def update_job(
     db.execute(f"UPDATE jobs SET {', '.join(fields)} WHERE id = ?", tuple(params))
 
 
+_UPDATE_PROGRESS_SQL = "UPDATE jobs SET progress = ?, updated_at = ? WHERE id = ?"
+
+
+def update_job_progress(job_id: str, progress: int) -> None:
+    """Progress-only tick: one fixed statement, no query building."""
+    db.execute(_UPDATE_PROGRESS_SQL, (progress, _now_iso(), job_id))
+
+
 def get_job(job_id: str) -> dict | None:
     row = db.fetch_one("SELECT * FROM jobs WHERE id = ?", (job_id,))
     if not row:
@@ -116,8 +168,22 @@ def enqueue_job(job_id: str, target: Callable[..., str], *args, **kwargs) -> Non
     def _run() -> None:
         update_job(job_id, status="in_progress", progress=0, message="Starting job...")
 
+        last = {"progress": 0, "message": "Starting job...", "at": time.monotonic()}
+
         def progress_cb(progress: int, message: str | None = None) -> None:
-            update_job(job_id, progress=progress, message=message)
+            now = time.monotonic()
+            if (
+                abs(progress - last["progress"]) < _PROGRESS_MIN_STEP
+                and (message is None or message == last["message"])
+                and now - last["at"] < _PROGRESS_MIN_INTERVAL
+            ):
+                return
+            if message is None or message == last["message"]:
+                update_job_progress(job_id, progress)
+            else:
+                update_job(job_id, progress=progress, message=message)
+                last["message"] = message
+            last.update(progress=progress, at=now)
 
         try:
             result_path = target(*args, progress_cb=progress_cb, **kwargs)
@@ -130,6 +196,14 @@ def enqueue_job(job_id: str, target: Callable[..., str], *args, **kwargs) -> Non
 
     if RUN_JOBS_INLINE:
         _run()
-    else:
-        _warn_if_queue_deep()
-        _EXECUTOR.submit(_run)
+        return
+    if _SLOTS is not None and not _SLOTS.acquire(blocking=False):
+        update_job(job_id, status="error", message="Server busy; job was not queued.")
+        raise JobQueueFull(
+            f"Job queue full ({_MAX_WORKERS + _QUEUE_MAX} jobs)",
+            user_message="The server is busy with other jobs. Please try again shortly.",
+        )
+    _warn_if_queue_deep()
+    future = _EXECUTOR.submit(_run)
+    if _SLOTS is not None:
+        future.add_done_callback(lambda _future: _SLOTS.release())
@@ -2,18 +2,26 @@
 
 from __future__ import annotations
 
-import json
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 import math
+import os
 import shutil
+import struct
 import subprocess
+import tempfile
+import threading
+import time
 import wave
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable
+from typing import Any, Iterable
 
-from studyscribe.core.config import settings
+import orjson
+
+from studyscribe.core.config import get_settings
 from studyscribe.core.storage import StorageError, check_disk_space, ensure_private_dir
-from .retrieval import build_chunks
+from .retrieval import build_chunks, prime_index
 
 
 class TranscriptionError(RuntimeError):
@@ -22,10 +30,22 @@ class TranscriptionError(RuntimeError):
         self.user_message = user_message or message
 
 
+def _is_model_ready_wav(audio_path: Path) -> bool:
+    try:
+        with wave.open(str(audio_path), "rb") as wav_file:
+            params = (wav_file.getnchannels(), wav_file.getsampwidth(), wav_file.getframerate())
+    except (wave.Error, EOFError):
+        return False
+    return params == (1, 2, _MODEL_SAMPLE_RATE)
+
+
 def _ensure_wav(audio_path: Path, work_dir: Path) -> Path:
     ensure_private_dir(work_dir)
     if audio_path.suffix.lower() == ".wav":
-        return audio_path
+        # Other WAV layouts are normalised by ffmpeg when present; without it
+        # they still transcribe via on-disk chunks that faster_whisper resamples.
+        if _is_model_ready_wav(audio_path) or not shutil.which("ffmpeg"):
+            return audio_path
     if not shutil.which("ffmpeg"):
         raise TranscriptionError(
             "ffmpeg not found",
@@ -34,17 +54,27 @@ def _ensure_wav(audio_path: Path, work_dir: Path) -> Path:
     output_path = work_dir / f"{audio_path.stem}.wav"
     command = [
         "ffmpeg",
+        "-nostdin",
+        "-hide_banner",
+        "-loglevel",
+        "error",
         "-y",
+        "-threads",
+        "0",
         "-i",
         str(audio_path),
+        "-vn",
         "-ac",
         "1",
         "-ar",
         "16000",
+        "-c:a",
+        "pcm_s16le",
         str(output_path),
     ]
     try:
-        subprocess.run(command, check=True, capture_output=True)
+        # Only errors are logged, so stderr stays small; stdout is never read.
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
     except subprocess.CalledProcessError as exc:
         raise TranscriptionError(
             "ffmpeg conversion failed",
@@ -53,49 +83,243 @@ def _ensure_wav(audio_path: Path, work_dir: Path) -> Path:
     return output_path
 
 
+def _wav_header(channels: int, sample_width: int, frame_rate: int, data_len: int) -> bytes:
+    """Canonical 44-byte PCM RIFF header, as written by ``wave`` for the same params."""
+    block_align = channels * sample_width
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF",
+        36 + data_len,
+        b"WAVE",
+        b"fmt ",
+        16,
+        1,
+        channels,
+        frame_rate,
+        frame_rate * block_align,
+        block_align,
+        sample_width * 8,
+        b"data",
+        data_len,
+    )
+
+
 def _chunk_wav(wav_path: Path, work_dir: Path, chunk_seconds: int) -> list[Path]:
     ensure_private_dir(work_dir)
     chunk_paths: list[Path] = []
     with wave.open(str(wav_path), "rb") as wav_file:
+        channels = wav_file.getnchannels()
+        sample_width = wav_file.getsampwidth()
         frame_rate = wav_file.getframerate()
         total_frames = wav_file.getnframes()
         frames_per_chunk = int(frame_rate * chunk_seconds)
         total_chunks = int(math.ceil(total_frames / frames_per_chunk))
+        full_header = _wav_header(channels, sample_width, frame_rate, frames_per_chunk * channels * sample_width)
         # Chunk long audio to keep model memory stable and enable progress updates.
+        # Frames are copied verbatim behind a precomputed header rather than
+        # round-tripping each chunk through wave.Wave_write.
         for chunk_index in range(total_chunks):
             chunk_frames = wav_file.readframes(frames_per_chunk)
             if not chunk_frames:
                 break
+            header = full_header
+            if len(chunk_frames) != frames_per_chunk * channels * sample_width:
+                header = _wav_header(channels, sample_width, frame_rate, len(chunk_frames))
             chunk_path = work_dir / f"chunk_{chunk_index:03d}.wav"
-            with wave.open(str(chunk_path), "wb") as chunk_file:
-                chunk_file.setnchannels(wav_file.getnchannels())
-                chunk_file.setsampwidth(wav_file.getsampwidth())
-                chunk_file.setframerate(frame_rate)
-                chunk_file.writeframes(chunk_frames)
+            with chunk_path.open("wb") as chunk_file:
+                chunk_file.write(header)
+                chunk_file.write(chunk_frames)
             chunk_paths.append(chunk_path)
     return chunk_paths
 
 
-def _load_model():
+# faster_whisper takes float32 sample arrays directly when audio is 16 kHz mono,
+# which is what _ensure_wav's ffmpeg conversion produces.
+_MODEL_SAMPLE_RATE = 16000
+# Chunk splits may move up to this far to land in the quietest 30 ms window.
+_SPLIT_SEARCH_SECONDS = 3
+_SPLIT_WINDOW_MS = 30
+# Minimum gap between per-chunk progress callbacks.
+_PROGRESS_INTERVAL_SECONDS = 0.25
+
+_MODEL_LOCK = threading.Lock()
+_MODEL: tuple[tuple[int, str | None], Any] | None = None
+
+
+def _in_memory_chunk_count(wav_path: Path, chunk_seconds: int) -> int | None:
+    """Chunk count when ``wav_path`` can be fed to the model as arrays, else ``None``."""
+    with wave.open(str(wav_path), "rb") as wav_file:
+        params = (wav_file.getnchannels(), wav_file.getsampwidth(), wav_file.getframerate())
+        total_frames = wav_file.getnframes()
+    if params != (1, 2, _MODEL_SAMPLE_RATE):
+        return None
+    return int(math.ceil(total_frames / (_MODEL_SAMPLE_RATE * chunk_seconds)))
+
+
+def _quietest_frame(samples, target: int, search: int) -> int:
+    """Centre of the lowest-energy 30 ms window within ``search`` frames of ``target``.
+
+    Windows are laid out so one is centred on ``target``, and ties go to the
+    window nearest it, so silent or constant audio splits on schedule.
+    """
+    import numpy as np
+
+    window = _MODEL_SAMPLE_RATE * _SPLIT_WINDOW_MS // 1000
+    reach = (search - window // 2) // window
+    lo = target - window // 2 - reach * window
+    count = min(2 * reach + 1, (len(samples) - lo) // window)
+    if reach < 0 or count <= 0:
+        return target
+    energy = np.square(samples[lo : lo + count * window].reshape(count, window)).sum(axis=1)
+    centres = target - reach * window + np.flatnonzero(energy == energy.min()) * window
+    return int(centres[np.argmin(np.abs(centres - target))])
+
+
+def _iter_wav_samples(wav_path: Path, chunk_seconds: int, total_chunks: int):
+    """Yield ``(offset_seconds, samples)`` with each split moved to nearby silence.
+
+    Chunk ``k`` ends at the quietest 30 ms window within ``_SPLIT_SEARCH_SECONDS``
+    of ``k * chunk_seconds`` so words are not cut at the seams; the chunk count
+    stays the same as a fixed split.
+    """
+    # numpy ships with faster_whisper, so it is imported only once the model loaded.
+    import numpy as np
+
+    def read(frames: int):
+        samples = np.frombuffer(wav_file.readframes(frames), dtype="<i2").astype(np.float32)
+        # Scale in place: one float32 buffer per read instead of two. The
+        # factor is a power of two, so values match faster_whisper's decode.
+        samples *= 1 / 32768.0
+        return samples
+
+    frames_per_chunk = _MODEL_SAMPLE_RATE * chunk_seconds
+    search = min(_MODEL_SAMPLE_RATE * _SPLIT_SEARCH_SECONDS, frames_per_chunk // 2)
+    with wave.open(str(wav_path), "rb") as wav_file:
+        total_frames = wav_file.getnframes()
+        pending = read(0)
+        start = 0
+        for chunk_index in range(1, total_chunks):
+            target = chunk_index * frames_per_chunk - start
+            wanted = target + search - len(pending)
+            if wanted > 0:
+                pending = np.concatenate((pending, read(wanted)))
+            if len(pending) <= target:
+                break
+            cut = _quietest_frame(pending, target, search)
+            yield start / _MODEL_SAMPLE_RATE, pending[:cut]
+            pending = pending[cut:]
+            start += cut
+        pending = np.concatenate((pending, read(total_frames - start - len(pending))))
+        if len(pending):
+            yield start / _MODEL_SAMPLE_RATE, pending
+
+
+def _detect_compute_type() -> tuple[str, str]:
+    """Pick (device, compute_type): int8 weights with fp16 activations on CUDA, int8 on CPU."""
     try:
-        from faster_whisper import WhisperModel
-    except ImportError as exc:
-        raise TranscriptionError(
-            "faster_whisper not installed",
-            user_message="Transcription engine missing. Install faster_whisper to run transcription.",
-        ) from exc
-    return WhisperModel("base", compute_type="int8")
+        import ctranslate2
+
+        if ctranslate2.get_cuda_device_count() > 0:
+            return "cuda", "int8_float16"
+    except Exception:  # pragma: no cover - depends on the installed CTranslate2 build
+        pass
+    return "cpu", "int8"
+
+
+def _load_model(workers: int = 1, compute_type: str | None = None):
+    global _MODEL
+    key = (workers, compute_type)
+    cached = _MODEL
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    with _MODEL_LOCK:
+        if _MODEL is not None and _MODEL[0] == key:
+            return _MODEL[1]
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as exc:
+            raise TranscriptionError(
+                "faster_whisper not installed",
+                user_message="Transcription engine missing. Install faster_whisper to run transcription.",
+            ) from exc
+        device, detected = _detect_compute_type()
+        # Loading maps ~150 MB of weights, so one model is shared across jobs.
+        # num_workers lets CTranslate2 run that many transcribe() calls concurrently,
+        # and the CPU threads are split between them.
+        model = WhisperModel(
+            "base",
+            device=device,
+            compute_type=compute_type or detected,
+            cpu_threads=max(1, (os.cpu_count() or 1) // workers),
+            num_workers=workers,
+        )
+        _MODEL = (key, model)
+        return model
+
+
+def reset_model() -> None:
+    """Drop the cached WhisperModel (used by tests)."""
+    global _MODEL
+    with _MODEL_LOCK:
+        _MODEL = None
+
+
+def _transcribe_chunk(model, chunk: tuple[float, Any]) -> tuple[float, list]:
+    offset, chunk_input = chunk
+    result_segments, _ = model.transcribe(chunk_input)
+    # Segments decode lazily, so drain them on the thread that owns the chunk.
+    return offset, list(result_segments)
+
+
+def _transcribe_chunks(model, chunk_inputs: Iterable[tuple[float, Any]], workers: int):
+    """Yield ``(offset, segments)`` per chunk in order, keeping up to ``workers`` in flight."""
+    if workers <= 1:
+        for chunk_input in chunk_inputs:
+            yield _transcribe_chunk(model, chunk_input)
+        return
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="studyscribe-transcribe") as executor:
+        pending: deque[Future] = deque()
+        for chunk_input in chunk_inputs:
+            pending.append(executor.submit(_transcribe_chunk, model, chunk_input))
+            if len(pending) >= workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _write_json_records(path: Path, records: Iterable[dict]) -> None:
+    """Write a JSON array with one compact record per line.
+
+    Records are serialised one at a time so a long transcript never exists as
+    a single indented string, and the file stays line-diffable. They stream
+    into a temp file beside ``path`` that is swapped in with ``os.replace``:
+    the app mmaps ``chunks.json``, and truncating a mapped file can fault it.
+    """
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(b"[")
+            empty = True
+            for record in records:
+                handle.write(b"\n" if empty else b",\n")
+                handle.write(orjson.dumps(record))
+                empty = False
+            handle.write(b"]\n" if empty else b"\n]\n")
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
 
 
 def _write_transcript_files(transcript_dir: Path, segments: list[dict]) -> Path:
     ensure_private_dir(transcript_dir)
     transcript_path = transcript_dir / "transcript.json"
-    with transcript_path.open("w", encoding="utf-8") as handle:
-        json.dump(segments, handle, indent=2)
+    _write_json_records(transcript_path, segments)
     text_path = transcript_dir / "transcript.txt"
-    with text_path.open("w", encoding="utf-8") as handle:
-        for seg in segments:
-            handle.write(f"[{seg['start']:.2f}-{seg['end']:.2f}] {seg['text']}\n")
+    text_path.write_text(
+        "".join(f"[{seg['start']:.2f}-{seg['end']:.2f}] {seg['text']}\n" for seg in segments),
+        encoding="utf-8",
+    )
     return transcript_path
 
 
@@ -112,21 +336,41 @@ def transcribe_audio(
     transcript_dir = session_dir / "transcript"
     work_dir = session_dir / "work" / "chunks"
     wav_path = _ensure_wav(audio_path, session_dir / "work")
-    chunk_paths = _chunk_wav(wav_path, work_dir, settings.chunk_seconds)
-    if not chunk_paths:
+    settings = get_settings()
+    chunk_seconds = settings.chunk_seconds
+    chunk_paths: list[Path] = []
+    total_chunks = _in_memory_chunk_count(wav_path, chunk_seconds)
+    if total_chunks is None:
+        # Uploaded WAVs at other rates/layouts go through on-disk chunks so
+        # faster_whisper can resample them itself.
+        chunk_paths = _chunk_wav(wav_path, work_dir, chunk_seconds)
+        total_chunks = len(chunk_paths)
+    if not total_chunks:
         raise TranscriptionError("No audio data found", user_message="Audio file was empty.")
 
-    model = _load_model()
+    model = _load_model(settings.transcribe_workers, settings.whisper_compute_type)
+    if chunk_paths:
+        chunk_inputs: Iterable = [
+            (chunk_index * chunk_seconds, str(path)) for chunk_index, path in enumerate(chunk_paths)
+        ]
+    else:
+        chunk_inputs = _iter_wav_samples(wav_path, chunk_seconds, total_chunks)
     segments: list[dict] = []
     segment_id = 0
-    total_chunks = len(chunk_paths)
-    for chunk_index, chunk_path in enumerate(chunk_paths):
-        if progress_cb:
-            # Progress is chunk-based to provide stable UI updates on long audio.
+    results = _transcribe_chunks(model, chunk_inputs, settings.transcribe_workers)
+    reported_at = 0.0
+    for chunk_index in range(total_chunks):
+        now = time.monotonic()
+        if progress_cb and (chunk_index == 0 or now - reported_at >= _PROGRESS_INTERVAL_SECONDS):
+            # Progress is chunk-based to provide stable UI updates on long audio;
+            # short chunks finishing back to back are coalesced into one update.
             progress = int(((chunk_index) / total_chunks) * 100)
             progress_cb(progress, f"Transcribing chunk {chunk_index + 1}/{total_chunks}")
-        result_segments, _ = model.transcribe(str(chunk_path))
-        offset = chunk_index * settings.chunk_seconds
+            reported_at = now
+        result = next(results, None)
+        if result is None:
+            break
+        offset, result_segments = result
         for seg in result_segments:
             segments.append(
                 {
@@ -142,8 +386,10 @@ def transcribe_audio(
     transcript_path = _write_transcript_files(transcript_dir, segments)
     chunks = build_chunks(segments)
     chunks_path = transcript_dir / "chunks.json"
-    with chunks_path.open("w", encoding="utf-8") as handle:
-        json.dump(chunks, handle, indent=2)
+    _write_json_records(chunks_path, chunks)
+    # The index is keyed by chunk text, so session-scope Q&A over the
+    # chunks.json just written hits it without re-tokenising.
+    prime_index(chunks)
     if progress_cb:
         progress_cb(100, "Transcription complete.")
     return str(transcript_path)
@@ -153,9 +399,8 @@ def load_transcript(transcript_path: Path) -> list[dict]:
     if not transcript_path.exists():
         return []
     try:
-        with transcript_path.open("r", encoding="utf-8") as handle:
-            data = json.load(handle)
-    except json.JSONDecodeError:
+        data = orjson.loads(transcript_path.read_bytes())
+    except orjson.JSONDecodeError:
         return []
     if isinstance(data, list):
         return data
@@ -12,13 +12,17 @@ if str(ROOT_DIR) not in sys.path:
 from studyscribe import app as app_module  # noqa: E402
 
 
-def _make_wav_bytes(duration_seconds: int = 1, frame_rate: int = 16000) -> bytes:
+def _make_wav_bytes(
+    duration_seconds: int = 1, frame_rate: int = 16000, channels: int = 1, frames: bytes | None = None
+) -> bytes:
+    """16-bit PCM WAV bytes; ``frames`` overrides the default silence."""
     buffer = io.BytesIO()
     with wave.open(buffer, "wb") as wav_file:
-        wav_file.setnchannels(1)
+        wav_file.setnchannels(channels)
         wav_file.setsampwidth(2)
         wav_file.setframerate(frame_rate)
-        frames = b"\x00\x00" * frame_rate * duration_seconds
+        if frames is None:
+            frames = b"\x00\x00" * channels * frame_rate * duration_seconds
         wav_file.writeframes(frames)
     return buffer.getvalue()
 
@@ -35,3 +39,8 @@ def app_client(tmp_path):
 @pytest.fixture()
 def sample_wav_bytes():
     return _make_wav_bytes()
+
+
+@pytest.fixture()
+def make_wav_bytes():
+    return _make_wav_bytes
@@ -1,10 +1,21 @@
+from collections import namedtuple
+from concurrent.futures import Future
+from datetime import date
 import io
 import json
+import shutil
+import sqlite3
+import sys
+import threading
+import types
 from pathlib import Path
 
+import pytest
+from werkzeug.datastructures import FileStorage
+
 import studyscribe.app as app_module
-from studyscribe.core import config
-from studyscribe.services import jobs
+from studyscribe.core import config, db, storage
+from studyscribe.services import gemini, jobs
 
 
 def _create_module(client, name="Test Module"):
@@ -74,3 +85,758 @@ def test_start_transcription_job(app_client, sample_wav_bytes, monkeypatch):
     assert payload["result"].endswith("transcript.json")
     transcript_path = config.DATA_DIR / "modules" / module_id / "sessions" / session_id / "transcript" / "transcript.json"
     assert transcript_path.exists()
+
+
+def _write_pdf(path, text):
+    fitz = pytest.importorskip("fitz")
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), text)
+    doc.save(path)
+
+
+def test_attachment_index_reuses_cached_extractions(app_client, monkeypatch):
+    module_id = _create_module(app_client)
+    session_id = _create_session(app_client, module_id)
+    session_dir = config.DATA_DIR / "modules" / module_id / "sessions" / session_id
+    attachments_dir = session_dir / "attachments"
+    _write_pdf(attachments_dir / "a.pdf", "Lecture a")
+    _write_pdf(attachments_dir / "b.pdf", "Lecture b")
+    app_module._rebuild_attachment_index(session_dir)
+    assert "Lecture a" in (attachments_dir / "extracted.txt").read_text()
+
+    def fail_extract(path_str, ext):
+        raise AssertionError(f"unexpected re-extraction of {path_str}")
+
+    monkeypatch.setattr(app_module, "_extract_one", fail_extract)
+    (attachments_dir / "b.pdf").unlink()
+    app_module._rebuild_attachment_index(session_dir)
+    extracted = (attachments_dir / "extracted.txt").read_text()
+    assert "Lecture a" in extracted
+    assert "Lecture b" not in extracted
+
+
+def test_attachment_rebuild_skips_files_deleted_mid_rebuild(app_client, monkeypatch):
+    module_id = _create_module(app_client)
+    session_id = _create_session(app_client, module_id)
+    session_dir = config.DATA_DIR / "modules" / module_id / "sessions" / session_id
+    attachments_dir = session_dir / "attachments"
+    _write_pdf(attachments_dir / "a.pdf", "Lecture a")
+    _write_pdf(attachments_dir / "b.pdf", "Lecture b")
+    real_key = app_module._extract_cache_key
+    real_extract = app_module._extract_one
+
+    def key_after_delete(path):
+        # a.pdf is deleted between the directory listing and its stat.
+        if path.name == "a.pdf":
+            path.unlink()
+        return real_key(path)
+
+    def extract_after_delete(path_str, ext):
+        # b.pdf is deleted between its stat and its extraction.
+        Path(path_str).unlink()
+        return real_extract(path_str, ext)
+
+    monkeypatch.setattr(app_module, "_extract_cache_key", key_after_delete)
+    monkeypatch.setattr(app_module, "_extract_one", extract_after_delete)
+    app_module._rebuild_attachment_index(session_dir)
+    assert (attachments_dir / "extracted.txt").read_text() == ""
+    assert json.loads((attachments_dir / app_module.EXTRACT_CACHE_NAME).read_text()) == {}
+
+
+def test_attachment_search_ranks_matching_sources(app_client):
+    module_id = _create_module(app_client)
+    session_id = _create_session(app_client, module_id)
+    session_dir = config.DATA_DIR / "modules" / module_id / "sessions" / session_id
+    _write_pdf(session_dir / "attachments" / "bio.pdf", "Photosynthesis in plants")
+    _write_pdf(session_dir / "attachments" / "chem.pdf", "Covalent bonds")
+    app_module._rebuild_attachment_index(session_dir)
+    session_rows = [{"id": session_id, "module_id": module_id, "name": "Session 1"}]
+
+    has_sources, hits = app_module._search_attachment_fts(session_rows, "What is photosynthesis?")
+    assert has_sources is True
+    assert [hit["file_name"] for hit in hits] == ["bio.pdf"]
+    assert hits[0]["session_name"] == "Session 1"
+
+    (session_dir / "attachments" / "bio.pdf").unlink()
+    app_module._rebuild_attachment_index(session_dir)
+    has_sources, hits = app_module._search_attachment_fts(session_rows, "photosynthesis")
+    assert has_sources is True
+    assert hits == []
+
+
+def test_attachment_backfill_runs_once_per_session(app_client, monkeypatch):
+    module_id = _create_module(app_client)
+    session_ids = [_create_session(app_client, module_id, name=f"Session {i}") for i in range(3)]
+    session_rows = [{"id": session_id, "module_id": module_id, "name": "S"} for session_id in session_ids]
+    loads = []
+    real_load = app_module._load_extracted_sources
+    monkeypatch.setattr(
+        app_module, "_load_extracted_sources", lambda session_dir: loads.append(session_dir) or real_load(session_dir)
+    )
+    for _ in range(3):
+        assert app_module._search_attachment_fts(session_rows, "anything") == (False, [])
+    assert len(loads) == 3
+
+
+def test_attachment_search_handles_many_sessions_in_scope(app_client):
+    module_id = _create_module(app_client)
+    session_id = _create_session(app_client, module_id)
+    app_module._insert_attachment_fts(session_id, [{"file_name": "bio.pdf", "text": "Mitochondria"}])
+    app_module._mark_attachments_indexed(session_id)
+    session_rows = [{"id": session_id, "module_id": module_id, "name": "Real"}]
+    session_rows += [{"id": f"ghost-{i}", "module_id": module_id, "name": "Ghost"} for i in range(33000)]
+    has_sources, hits = app_module._search_attachment_fts(session_rows, "mitochondria")
+    assert has_sources is True
+    assert [(hit["file_name"], hit["session_name"]) for hit in hits] == [("bio.pdf", "Real")]
+
+
+def test_attachment_search_probes_fts_by_rowid_within_scope(app_client):
+    plan = db.fetch_all(
+        """
+        EXPLAIN QUERY PLAN
+        SELECT s.id FROM attachment_sources AS s
+        CROSS JOIN attachment_fts ON attachment_fts.rowid = s.id
+        WHERE s.session_id IN (SELECT value FROM json_each(?)) AND attachment_fts MATCH ?
+        """,
+        ('["s"]', '"cell"'),
+    )
+    details = [row["detail"] for row in plan]
+    assert "idx_attachment_sources_session" in details[0]
+    assert any("attachment_fts" in detail and "=M" in detail for detail in details)
+
+
+def test_large_attachment_upload_is_renamed_into_place(app_client, monkeypatch):
+    module_id = _create_module(app_client)
+    session_id = _create_session(app_client, module_id)
+    attachments_dir = config.DATA_DIR / "modules" / module_id / "sessions" / session_id / "attachments"
+    monkeypatch.setattr(app_module, "_rebuild_attachment_index", lambda session_dir, progress_cb=None: "")
+    monkeypatch.setattr(jobs, "RUN_JOBS_INLINE", True)
+    payload = b"%PDF" + b"\x00" * (600 * 1024)
+
+    response = app_client.post(
+        f"/modules/{module_id}/sessions/{session_id}/upload-attachment",
+        data={
+            "attachment": [
+                (io.BytesIO(payload), "big.pdf", "application/pdf"),
+                (io.BytesIO(payload), "notes.txt", "text/plain"),
+            ]
+        },
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 302
+    assert (attachments_dir / "big.pdf").read_bytes() == payload
+    assert sorted(path.name for path in attachments_dir.iterdir()) == ["big.pdf"]
+
+
+def test_db_transaction_rolls_back_and_nests(app_client):
+    module_id = _create_module(app_client)
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.execute("DELETE FROM modules WHERE id = ?", (module_id,))
+            raise RuntimeError("boom")
+    assert db.fetch_one("SELECT id FROM modules WHERE id = ?", (module_id,)) is not None
+
+    with db.transaction():
+        db.execute("UPDATE modules SET name = ? WHERE id = ?", ("Outer", module_id))
+        with pytest.raises(RuntimeError):
+            with db.transaction():
+                db.execute("UPDATE modules SET name = ? WHERE id = ?", ("Inner", module_id))
+                raise RuntimeError("boom")
+    row = db.fetch_one("SELECT name FROM modules WHERE id = ?", (module_id,))
+    assert row["name"] == "Outer"
+
+
+def test_delete_session_moves_directory_to_trash(app_client, monkeypatch):
+    submitted = []
+
+    def fake_submit(fn, path):
+        submitted.append(path)
+        future = Future()
+        future.set_result(None)
+        return future
+
+    monkeypatch.setattr(app_module._CLEANUP_POOL, "submit", fake_submit)
+    module_id = _create_module(app_client)
+    session_id = _create_session(app_client, module_id)
+    session_dir = config.DATA_DIR / "modules" / module_id / "sessions" / session_id
+    app_client.get(f"/sessions/{session_id}")
+    assert session_dir.exists()
+
+    response = app_client.delete(f"/sessions/{session_id}")
+    assert response.status_code == 200
+    assert not session_dir.exists()
+    assert len(submitted) == 1
+    assert submitted[0].parent == session_dir.parent
+    assert submitted[0].name.startswith(app_module.TRASH_PREFIX)
+
+
+def test_attachment_exists_cache_is_invalidated_on_upload_and_delete(app_client, monkeypatch):
+    monkeypatch.setattr(app_module, "_rebuild_attachment_index", lambda session_dir, progress_cb=None: "")
+    monkeypatch.setattr(jobs, "RUN_JOBS_INLINE", True)
+    module_id = _create_module(app_client)
+    session_id = _create_session(app_client, module_id)
+    base = f"/modules/{module_id}/sessions/{session_id}"
+    assert app_client.get(f"{base}/attachments/notes.pdf").status_code == 404
+
+    app_client.post(
+        f"{base}/upload-attachment",
+        data={"attachment": (io.BytesIO(b"%PDF"), "notes.pdf")},
+        content_type="multipart/form-data",
+    )
+    assert app_client.get(f"{base}/attachments/notes.pdf").status_code == 200
+
+    app_client.post(f"{base}/delete-attachment", data={"filename": "notes.pdf"})
+    assert app_client.get(f"{base}/attachments/notes.pdf").status_code == 404
+
+
+def test_segment_tags_and_notes_are_stored_in_sqlite(app_client):
+    module_id = _create_module(app_client)
+    session_id = _create_session(app_client, module_id)
+    base = f"/modules/{module_id}/sessions/{session_id}"
+    for label in ("IMPORTANT", "CONFUSING"):
+        response = app_client.post(
+            f"{base}/segment-tags", json={"segment_id": "seg_0", "label": label, "checked": True}
+        )
+    assert response.get_json()["tags"] == ["IMPORTANT", "CONFUSING"]
+    response = app_client.post(
+        f"{base}/segment-tags", json={"segment_id": "seg_0", "label": "IMPORTANT", "checked": False}
+    )
+    assert response.get_json()["tags"] == ["CONFUSING"]
+
+    app_client.post(
+        f"{base}/annotations",
+        json={"personal_notes_markdown": "# Notes", "session_tags": ["Chem"]},
+    )
+    row = db.fetch_one(
+        "SELECT annotations_json FROM session_annotations WHERE session_id = ?", (session_id,)
+    )
+    assert json.loads(row["annotations_json"]) == {
+        "notes": "",
+        "notes_html": "",
+        "notes_markdown": "# Notes",
+        "session_tags": ["Chem"],
+        "tags": {"seg_0": ["CONFUSING"]},
+    }
+
+
+def test_legacy_annotations_file_is_imported(app_client):
+    module_id = _create_module(app_client)
+    session_id = _create_session(app_client, module_id)
+    session_dir = config.DATA_DIR / "modules" / module_id / "sessions" / session_id
+    session_dir.mkdir(parents=True, exist_ok=True)
+    (session_dir / "annotations.json").write_text(
+        json.dumps({"tags": {"seg_1": ["EXAM-SIGNAL"]}, "notes": "old notes", "session_tags": []})
+    )
+
+    annotations = app_module._load_annotations(session_dir)
+    assert annotations["tags"] == {"seg_1": ["EXAM-SIGNAL"]}
+    assert annotations["notes"] == "old notes"
+    assert not (session_dir / "annotations.json").exists()
+
+
+def test_save_annotations_replaces_segment_tags_in_batches(app_client):
+    module_id = _create_module(app_client)
+    session_id = _create_session(app_client, module_id)
+    tags = [f"seg_{index}:IMPORTANT" for index in range(120)] + ["seg_0:CONFUSING", "seg_0:bogus", " seg_0 : important"]
+    app_client.post(f"/modules/{module_id}/sessions/{session_id}/annotations", json={"tags": tags})
+
+    rows = db.fetch_all(
+        "SELECT segment_id, label FROM session_segment_tags WHERE session_id = ?", (session_id,)
+    )
+    assert len(rows) == 121
+    annotations = app_module._load_annotations(
+        config.DATA_DIR / "modules" / module_id / "sessions" / session_id
+    )
+    assert annotations["tags"]["seg_0"] == ["IMPORTANT", "CONFUSING"]
+
+
+def test_source_preview_reads_promoted_columns(app_client):
+    module_id = _create_module(app_client)
+    session_id = _create_session(app_client, module_id)
+    message_id = app_module._store_ai_message(session_id, "assistant", "Answer")
+    app_module._store_ai_sources(
+        message_id,
+        [
+            {
+                "source_id": "S1",
+                "kind": "transcript",
+                "title": "Lecture 00:05",
+                "excerpt": "Entropy increases.",
+                "open_url": "/sessions/x#t=5",
+                "locator": {"t_start": 5.0, "t_end": 9.0},
+            }
+        ],
+        "Session 1",
+    )
+
+    response = app_client.get(f"/api/sources/S1/preview?session_id={session_id}")
+    payload = response.get_json()
+    assert payload["title"] == "Lecture 00:05"
+    assert payload["excerpt"] == "Entropy increases."
+    assert payload["open_url"] == "/sessions/x#t=5"
+    assert payload["meta"]["start_time"] == 5.0
+
+
+def test_source_preview_query_uses_index_order(app_client):
+    plan = db.fetch_all(
+        """
+        EXPLAIN QUERY PLAN
+        SELECT s.source_id FROM ai_message_sources s
+        JOIN ai_messages m ON m.id = s.message_id
+        WHERE s.source_id = ? AND m.session_id = ?
+        ORDER BY s.id DESC
+        LIMIT 1
+        """,
+        ("S1", "session"),
+    )
+    details = " ".join(row["detail"] for row in plan)
+    assert "idx_ai_sources_lookup" in details
+    assert "TEMP B-TREE" not in details
+
+
+def test_open_attachment_supports_range_requests(app_client):
+    module_id = _create_module(app_client)
+    session_id = _create_session(app_client, module_id)
+    attachments_dir = config.DATA_DIR / "modules" / module_id / "sessions" / session_id / "attachments"
+    attachments_dir.mkdir(parents=True, exist_ok=True)
+    (attachments_dir / "slides.pdf").write_bytes(b"%PDF-1.4 0123456789")
+
+    response = app_client.get(
+        f"/modules/{module_id}/sessions/{session_id}/attachments/slides.pdf",
+        headers={"Range": "bytes=0-3"},
+    )
+    assert response.status_code == 206
+    assert response.data == b"%PDF"
+    assert response.headers.get("ETag")
+
+
+def test_open_attachment_returns_404_when_file_vanishes(app_client, monkeypatch):
+    module_id = _create_module(app_client)
+    session_id = _create_session(app_client, module_id)
+    monkeypatch.setattr(app_module, "_path_exists", lambda path: True)
+    response = app_client.get(f"/modules/{module_id}/sessions/{session_id}/attachments/gone.pdf")
+    assert response.status_code == 404
+
+
+def test_open_attachment_accel_redirect_uses_the_session_row(app_client, monkeypatch):
+    module_id = _create_module(app_client)
+    session_id = _create_session(app_client, module_id)
+    monkeypatch.setattr(app_module, "_ACCEL_REDIRECT_PREFIX", "/protected")
+    monkeypatch.setattr(app_module, "_path_exists", lambda path: True)
+    response = app_client.get(f"/modules/{module_id}/sessions/{session_id}/attachments/week 1.pdf")
+    assert response.status_code == 200
+    assert response.headers["X-Accel-Redirect"] == (
+        f"/protected/{module_id}/sessions/{session_id}/attachments/week%201.pdf"
+    )
+    for bad_module, bad_session in (("other", session_id), (module_id, "missing")):
+        response = app_client.get(f"/modules/{bad_module}/sessions/{bad_session}/attachments/week 1.pdf")
+        assert response.status_code == 404
+        assert "X-Accel-Redirect" not in response.headers
+
+
+def test_bulk_attachment_delete_rebuilds_index_once(app_client, monkeypatch):
+    rebuilds = []
+    monkeypatch.setattr(
+        app_module,
+        "_rebuild_attachment_index",
+        lambda session_dir, progress_cb=None: rebuilds.append(session_dir),
+    )
+    module_id = _create_module(app_client)
+    session_id = _create_session(app_client, module_id)
+    attachments_dir = config.DATA_DIR / "modules" / module_id / "sessions" / session_id / "attachments"
+    attachments_dir.mkdir(parents=True, exist_ok=True)
+    for name in ("a.pdf", "b.pdf", "c.pdf"):
+        (attachments_dir / name).write_bytes(b"%PDF")
+
+    response = app_client.post(
+        f"/modules/{module_id}/sessions/{session_id}/delete-attachments-bulk",
+        json={"filenames": ["a.pdf", "b.pdf", "../escape.pdf"]},
+        headers={"Accept": "application/json"},
+    )
+    assert response.get_json() == {"ok": True, "deleted": ["a.pdf", "b.pdf"]}
+    assert len(rebuilds) == 1
+    assert not (attachments_dir / "a.pdf").exists()
+    assert (attachments_dir / "c.pdf").exists()
+
+
+@pytest.mark.parametrize("route", ["delete-audio", "delete-attachment"])
+def test_single_file_delete_rejects_traversal_names(app_client, route):
+    module_id = _create_module(app_client)
+    session_id = _create_session(app_client, module_id, name="Session A")
+    other_id = _create_session(app_client, module_id, name="Session B")
+    other_dir = config.DATA_DIR / "modules" / module_id / "sessions" / other_id
+    other_dir.mkdir(parents=True, exist_ok=True)
+    (other_dir / "keep.txt").write_text("keep")
+
+    for filename in (f"../../{other_id}", "..", "."):
+        response = app_client.post(
+            f"/modules/{module_id}/sessions/{session_id}/{route}",
+            data={"filename": filename},
+            headers={"Accept": "application/json"},
+        )
+        assert response.status_code == 400
+    assert (other_dir / "keep.txt").exists()
+    assert (config.DATA_DIR / "modules" / module_id / "sessions" / session_id).is_dir()
+
+
+def test_bulk_attachment_delete_skips_dot_dot(app_client):
+    module_id = _create_module(app_client)
+    session_id = _create_session(app_client, module_id)
+    session_dir = config.DATA_DIR / "modules" / module_id / "sessions" / session_id
+    (session_dir / "attachments").mkdir(parents=True, exist_ok=True)
+    response = app_client.post(
+        f"/modules/{module_id}/sessions/{session_id}/delete-attachments-bulk",
+        json={"filenames": [".."]},
+        headers={"Accept": "application/json"},
+    )
+    assert response.status_code == 400
+    assert (session_dir / "attachments").is_dir()
+
+
+def test_json_provider_matches_flask_defaults(app_client):
+    provider = app_module.app.json
+    assert provider.dumps({"b": 1, "a": {2: "x"}}) == '{"a":{"2":"x"},"b":1}'
+    assert provider.loads(b'{"a": [1, 2]}') == {"a": [1, 2]}
+    assert json.loads(provider.dumps({"when": date(2024, 1, 2)})) == {
+        "when": "Tue, 02 Jan 2024 00:00:00 GMT"
+    }
+
+
+def test_fast_rmtree_removes_nested_tree(tmp_path):
+    root = tmp_path / "module"
+    for index in range(3):
+        nested = root / "sessions" / f"s{index}" / "audio"
+        nested.mkdir(parents=True)
+        (nested / "lecture.wav").write_bytes(b"x")
+        (root / "sessions" / f"s{index}" / "annotations.json").write_text("{}")
+    (root / "link").symlink_to(root / "sessions")
+
+    app_module._fast_rmtree(root)
+
+    assert not root.exists()
+    assert tmp_path.exists()
+
+
+def test_rejected_attachment_upload_creates_no_directories(app_client):
+    module_id = _create_module(app_client)
+    session_id = _create_session(app_client, module_id)
+    session_dir = config.DATA_DIR / "modules" / module_id / "sessions" / session_id
+    shutil.rmtree(session_dir)
+
+    response = app_client.post(
+        f"/modules/{module_id}/sessions/{session_id}/upload-attachment",
+        data={"attachment": (io.BytesIO(b"MZ"), "tool.exe")},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 400
+    assert not session_dir.exists()
+
+
+def test_ai_notes_polling_returns_not_modified(app_client):
+    module_id = _create_module(app_client)
+    session_id = _create_session(app_client, module_id)
+    notes_dir = config.DATA_DIR / "modules" / module_id / "sessions" / session_id / "notes"
+    notes_dir.mkdir(parents=True, exist_ok=True)
+    (notes_dir / "ai_notes.md").write_text("# Notes")
+    url = f"/modules/{module_id}/sessions/{session_id}/ai-notes"
+
+    first = app_client.get(url)
+    assert first.status_code == 200
+    assert first.get_json()["notes"] == "# Notes"
+    etag = first.headers["ETag"]
+
+    second = app_client.get(url, headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.data == b""
+
+
+def test_session_lookup_is_memoized_per_request(app_client, monkeypatch):
+    module_id = _create_module(app_client, name="Physics")
+    session_id = _create_session(app_client, module_id)
+    calls = []
+    original = db.get_session_with_module
+    monkeypatch.setattr(db, "get_session_with_module", lambda sid: calls.append(sid) or original(sid))
+
+    with app_module.app.test_request_context():
+        row = app_module._get_session(session_id)
+        assert row["module_name"] == "Physics"
+        assert app_module._get_session(session_id, module_id) is row
+        assert app_module._get_session(session_id, "other-module") is None
+    assert calls == [session_id]
+
+
+def test_sidebar_modules_cache_is_invalidated_on_writes(app_client):
+    module_id = _create_module(app_client, name="Biology")
+
+    def cached_names():
+        return {module["name"] for module in app_module._cached_modules() if module["id"] == module_id}
+
+    assert cached_names() == {"Biology"}
+    app_client.patch(f"/modules/{module_id}", json={"name": "Zoology"})
+    assert cached_names() == {"Zoology"}
+    app_client.delete(f"/modules/{module_id}")
+    assert cached_names() == set()
+
+
+def test_view_module_lists_sessions(app_client):
+    module_id = _create_module(app_client, name="Chemistry")
+    response = app_client.get(f"/modules/{module_id}")
+    assert response.status_code == 200
+    assert b"Chemistry" in response.data
+
+    _create_session(app_client, module_id, name="Lecture A")
+    _create_session(app_client, module_id, name="Lecture B")
+    body = app_client.get(f"/modules/{module_id}").get_data(as_text=True)
+    assert body.index("Lecture B") < body.index("Lecture A")
+    assert app_client.get("/modules/missing").status_code == 404
+
+
+def test_ensure_session_dirs_skips_known_dirs_until_reset(tmp_path):
+    session_dir = tmp_path / "sessions" / "s1"
+    app_module._ensure_session_dirs(session_dir)
+    assert (session_dir / "audio").is_dir()
+
+    shutil.rmtree(session_dir / "audio")
+    app_module._ensure_session_dirs(session_dir)
+    assert not (session_dir / "audio").exists()
+
+    app_module._reset_session_dirs_marker(session_dir)
+    app_module._ensure_session_dirs(session_dir)
+    assert (session_dir / "audio").is_dir()
+
+
+def test_create_app_initializes_once_per_paths(app_client, monkeypatch):
+    calls = []
+    monkeypatch.setattr(db, "init_db", lambda: calls.append(1))
+    app_module.create_app(testing=True)
+    assert calls == []
+
+    monkeypatch.setattr(config, "DATA_DIR", config.DATA_DIR / "other")
+    app_module.create_app(testing=True)
+    assert calls == [1]
+
+
+def test_format_size_unit_boundaries():
+    assert app_module._format_size(0) == "0 B"
+    assert app_module._format_size(1023) == "1023 B"
+    assert app_module._format_size(1536) == "1.5 KB"
+    assert app_module._format_size(1024 * 1024) == "1.0 MB"
+    assert app_module._format_size(5 * 1024**3) == "5120.0 MB"
+
+
+def test_large_audio_upload_spools_into_audio_dir(app_client, monkeypatch):
+    module_id = _create_module(app_client)
+    session_id = _create_session(app_client, module_id)
+    url = f"/modules/{module_id}/sessions/{session_id}/upload-audio"
+    payload = b"\x00" * (app_module._UPLOAD_SPOOL_THRESHOLD + 1)
+    app_client.post(url, data={"audio": (io.BytesIO(payload), "first.wav")}, content_type="multipart/form-data")
+
+    copies = []
+    monkeypatch.setattr(FileStorage, "save", lambda self, dst, buffer_size=16384: copies.append(dst))
+    response = app_client.post(
+        url,
+        data={"audio": (io.BytesIO(payload), "second.wav"), "replace": "1"},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 302
+    assert copies == []
+    audio_dir = config.DATA_DIR / "modules" / module_id / "sessions" / session_id / "audio"
+    assert (audio_dir / "second.wav").stat().st_size == len(payload)
+    assert sorted(p.name for p in audio_dir.iterdir() if not p.name.startswith(app_module.TRASH_PREFIX)) == ["second.wav"]
+
+
+def test_routes_register_once_across_create_app_calls(app_client):
+    app_module.create_app(testing=True)
+    rules = [(rule.rule, tuple(sorted(rule.methods))) for rule in app_module.app.url_map.iter_rules()]
+    assert len(rules) == len(set(rules))
+
+
+def test_create_session_in_missing_module_returns_404(app_client):
+    response = app_client.post("/modules/missing/sessions", data={"name": "Orphan"})
+    assert response.status_code == 404
+    assert db.fetch_one("SELECT 1 FROM sessions WHERE module_id = 'missing'") is None
+
+
+def test_session_meta_is_escaped_for_script_block(app_client):
+    module_id = _create_module(app_client)
+    session_id = _create_session(app_client, module_id, name="</script><b>")
+    body = app_client.get(f"/sessions/{session_id}").get_data(as_text=True)
+    start = body.index('<script id="sessionMeta" type="application/json">') + len('<script id="sessionMeta" type="application/json">')
+    meta = json.loads(body[start : body.index("</script>", start)])
+    assert meta["sessionName"] == "</script><b>"
+    assert meta["sessionId"] == session_id
+
+
+def test_session_urls_match_url_for(app_client):
+    with app_module.app.test_request_context("/"):
+        urls = app_module._session_urls("mod-1", "sess-1")
+        assert urls["exportUrl"] == app_module.url_for("export_pack", module_id="mod-1", session_id="sess-1")
+        assert urls["qaMessagesUrl"] == app_module.url_for("api_ai_messages", session_id="sess-1")
+        assert urls["qaAskUrl"] == app_module.url_for("api_ai_ask")
+
+
+def test_db_reuses_thread_connection_and_follows_db_path(app_client, tmp_path):
+    first = db._thread_connection()
+    assert db._thread_connection() is first
+
+    with pytest.raises(sqlite3.IntegrityError):
+        db.execute("INSERT INTO sessions (id, module_id, name, created_at) VALUES ('s', 'missing', 'x', 'now')")
+    assert not first.in_transaction
+
+    original = config.DB_PATH
+    config.override_paths(db_path=tmp_path / "other.db")
+    try:
+        assert db._thread_connection() is not first
+    finally:
+        config.override_paths(db_path=original)
+        db.close_connection()
+
+
+def test_init_db_enables_wal_and_connection_pragmas(app_client):
+    conn = db.get_connection()
+    try:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+        assert conn.execute("PRAGMA cache_size").fetchone()[0] == -65536
+    finally:
+        conn.close()
+
+
+def test_job_progress_updates_are_coalesced(app_client, monkeypatch):
+    monkeypatch.setattr(jobs, "RUN_JOBS_INLINE", True)
+    writes = []
+    real_update = jobs.update_job
+    real_progress = jobs.update_job_progress
+    monkeypatch.setattr(jobs, "update_job", lambda job_id, **fields: (writes.append(fields), real_update(job_id, **fields)))
+    monkeypatch.setattr(
+        jobs, "update_job_progress", lambda job_id, progress: (writes.append({"progress": progress}), real_progress(job_id, progress))
+    )
+
+    def target(progress_cb=None):
+        for pct in range(100):
+            progress_cb(pct, "Working")
+        return "done"
+
+    job_id = jobs.create_job("Queued")
+    jobs.enqueue_job(job_id, target)
+    progress_writes = [fields for fields in writes if "status" not in fields]
+    assert 0 < len(progress_writes) <= 21
+    assert sum("message" in fields for fields in progress_writes) == 1
+    assert jobs.get_job(job_id)["status"] == "success"
+
+
+def test_disk_usage_is_cached_until_near_the_limit(tmp_path, monkeypatch):
+    Usage = namedtuple("Usage", "total used free")
+    calls = []
+    usage = {"value": Usage(100 * 1024**3, 10 * 1024**3, 90 * 1024**3)}
+    monkeypatch.setattr(storage.shutil, "disk_usage", lambda path: calls.append(path) or usage["value"])
+    monkeypatch.setattr(storage, "_USAGE_CACHE", {})
+    monkeypatch.setattr(storage, "_thresholds", lambda: (5.0, 0, 0.0))
+
+    storage.check_disk_space(tmp_path)
+    storage.check_disk_space(tmp_path)
+    assert len(calls) == 1
+
+    usage["value"] = Usage(100 * 1024**3, 94 * 1024**3, 6 * 1024**3)
+    storage._USAGE_CACHE.clear()
+    storage.check_disk_space(tmp_path)
+    storage.check_disk_space(tmp_path)
+    assert len(calls) == 3
+
+
+def test_gemini_client_is_reused_per_api_key(monkeypatch):
+    built = []
+    fake_genai = types.SimpleNamespace(Client=lambda api_key: built.append(api_key) or object())
+    monkeypatch.setitem(sys.modules, "google", types.SimpleNamespace(genai=fake_genai))
+    monkeypatch.setattr(gemini, "_CLIENT", None)
+    settings = {"key": "key-1"}
+    monkeypatch.setattr(gemini, "get_settings", lambda: types.SimpleNamespace(gemini_api_key=settings["key"]))
+
+    assert gemini._client() is gemini._client()
+    settings["key"] = "key-2"
+    gemini._client()
+    assert built == ["key-1", "key-2"]
+
+
+def test_gemini_does_not_retry_client_errors(monkeypatch):
+    class Rejected(Exception):
+        status_code = 403
+
+    calls = []
+
+    def generate_content(**kwargs):
+        calls.append(kwargs)
+        raise Rejected("quota project mismatch")
+
+    client = types.SimpleNamespace(models=types.SimpleNamespace(generate_content=generate_content))
+    monkeypatch.setattr(gemini, "_client", lambda: client)
+    monkeypatch.setattr(gemini.time, "sleep", lambda delay: pytest.fail("should not back off"))
+    with pytest.raises(gemini.GeminiError):
+        gemini._generate_content("prompt")
+    assert len(calls) == 1
+
+
+def test_enqueue_job_refuses_work_when_queue_is_full(app_client, monkeypatch):
+    monkeypatch.setattr(jobs, "_SLOTS", threading.BoundedSemaphore(1))
+    jobs._SLOTS.acquire()
+    job_id = jobs.create_job("Queued")
+    with pytest.raises(jobs.JobQueueFull):
+        jobs.enqueue_job(job_id, lambda progress_cb=None: "done")
+    assert jobs.get_job(job_id)["status"] == "error"
+
+
+def test_write_atomic_keeps_concurrent_writers_apart(tmp_path, monkeypatch):
+    target = tmp_path / "last_answer.json"
+    temp_names = []
+    real_replace = app_module.os.replace
+
+    def interleaved_replace(src, dst):
+        temp_names.append(Path(src).name)
+        if len(temp_names) == 1:
+            # A second writer finishes while the first is between write and replace.
+            app_module._write_atomic(target, b"second")
+        real_replace(src, dst)
+
+    monkeypatch.setattr(app_module.os, "replace", interleaved_replace)
+    app_module._write_atomic(target, b"first")
+    assert target.read_bytes() == b"first"
+    assert temp_names[0] != temp_names[1]
+    assert [path.name for path in tmp_path.iterdir()] == ["last_answer.json"]
+
+
+def test_write_atomic_temp_files_are_removed_on_failure_and_hidden(app_client, monkeypatch):
+    module_id = _create_module(app_client)
+    session_id = _create_session(app_client, module_id)
+    session_dir = config.DATA_DIR / "modules" / module_id / "sessions" / session_id
+    attachments_dir = session_dir / "attachments"
+    (attachments_dir / "slides.pdf").write_bytes(b"%PDF-1.4")
+    (attachments_dir / "extracted_sources.json.k2j4h1.tmp").write_bytes(b"[")
+    assert [item["name"] for item in app_module._collect_attachment_files(session_dir)] == ["slides.pdf"]
+
+    def failing_replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(app_module.os, "replace", failing_replace)
+    with pytest.raises(OSError):
+        app_module._write_atomic(attachments_dir / "extracted.txt", b"text")
+    assert not list(attachments_dir.glob("extracted.txt.*"))
+
+
+@pytest.mark.parametrize(
+    ("query", "index"),
+    [
+        ("SELECT id FROM sessions WHERE module_id = 'm' ORDER BY created_at DESC", "idx_sessions_module"),
+        ("SELECT id FROM modules ORDER BY created_at DESC", "idx_modules_created"),
+        ("SELECT id FROM ai_message_sources WHERE message_id = 1 ORDER BY id", "idx_ai_sources_message"),
+        ("SELECT DISTINCT file_name FROM attachment_sources WHERE session_id = 's'", "idx_attachment_sources_session"),
+        ("DELETE FROM attachment_sources WHERE session_id = 's' AND file_name = 'f'", "idx_attachment_sources_session"),
+        (
+            "SELECT 1 FROM attachment_sources WHERE session_id IN (SELECT value FROM json_each('[]'))",
+            "idx_attachment_sources_session",
+        ),
+    ],
+)
+def test_listing_queries_use_indexes(app_client, query, index):
+    details = " ".join(row["detail"] for row in db.fetch_all("EXPLAIN QUERY PLAN " + query))
+    assert index in details
+    assert "TEMP B-TREE" not in details
@@ -0,0 +1,57 @@
+import json
+
+from studyscribe.services import retrieval
+
+
+def test_retrieve_chunks_reuses_token_counts():
+    retrieval._token_counts.cache_clear()
+    chunks = [{"id": 0, "text": "Photosynthesis in plants"}, {"id": 1, "text": "Cell division basics"}]
+    for _ in range(3):
+        assert [chunk["id"] for chunk in retrieval.retrieve_chunks("plants photosynthesis", chunks)] == [0]
+    assert retrieval._token_counts.cache_info().misses == 2
+
+
+def test_bm25_index_can_be_limited_to_query_terms():
+    chunks = [{"text": "cell division"}, {"text": "cell membrane proteins"}, {"text": "plant cell"}]
+    full = retrieval.BM25Index(chunks)
+    limited = retrieval.BM25Index(chunks, vocabulary=["cell", "membrane"])
+    assert set(limited.doc_ids) == {"cell", "membrane"}
+    assert limited.df == {"cell": 3, "membrane": 1}
+    assert limited.retrieve("membrane cell") == full.retrieve("membrane cell")
+
+
+def test_retrieve_chunks_ranks_rare_terms_with_bm25():
+    chunks = [
+        {"id": 0, "text": "the lecture covers the the the the topic " * 5},
+        {"id": 1, "text": "mitochondria produce energy in the cell"},
+        {"id": 2, "text": "the cell membrane"},
+    ]
+    ranked = retrieval.retrieve_chunks("the mitochondria", chunks, k=2)
+    assert ranked[0]["id"] == 1
+    assert retrieval.retrieve_chunks("zebra", chunks) == []
+
+
+def test_tokenize_folds_case_and_splits_on_punctuation():
+    assert retrieval._tokenize("DNA-Replication, step 2!") == ["dna", "replication", "step", "2"]
+    assert retrieval.fts_match_query("Cell cell CELL") == '"cell"'
+
+
+def test_inverted_index_is_reused_for_the_same_corpus():
+    retrieval._inverted_index.cache_clear()
+    chunks = [{"text": "enzyme kinetics"}, {"text": "protein folding"}, {"text": "enzyme inhibition"}]
+    assert [c["text"] for c in retrieval.retrieve_chunks("enzyme", chunks)] == ["enzyme kinetics", "enzyme inhibition"]
+    retrieval.retrieve_chunks("folding", [dict(chunk) for chunk in chunks])
+    info = retrieval._inverted_index.cache_info()
+    assert (info.misses, info.hits) == (1, 1)
+    postings, doc_lens, _ = retrieval._inverted_index(tuple(chunk["text"] for chunk in chunks))
+    assert postings["enzyme"] == [0, 2]
+    assert doc_lens == [2, 2, 2]
+
+
+def test_prime_index_warms_session_scope_retrieval():
+    retrieval._inverted_index.cache_clear()
+    chunks = [{"id": 0, "text": "osmosis and diffusion"}, {"id": 1, "text": "active transport"}]
+    retrieval.prime_index(chunks)
+    loaded = json.loads(json.dumps(chunks))
+    assert retrieval.retrieve_chunks("osmosis", loaded)[0]["id"] == 0
+    assert retrieval._inverted_index.cache_info().hits == 1
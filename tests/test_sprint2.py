@@ -1,7 +1,7 @@
 import io
 import json
 from pathlib import Path
-from zipfile import ZipFile
+from zipfile import ZIP_STORED, ZipFile
 
 import studyscribe.app as app_module
 from studyscribe.core import config
@@ -102,7 +102,7 @@ def test_export_pack(app_client):
 
     response = app_client.post(
         f"/modules/{module_id}/sessions/{session_id}/export",
-        data={"include_transcript": "1", "include_audio": "1"},
+        data={"include_transcript": "1", "include_audio": "1", "include_prompt_manifest": "1"},
     )
     assert response.status_code == 200
     assert response.mimetype == "application/zip"
@@ -110,3 +110,10 @@ def test_export_pack(app_client):
     with ZipFile(zip_bytes) as zip_file:
         names = zip_file.namelist()
         assert any(name.endswith("manifest.json") for name in names)
+        transcript_name = next(name for name in names if name.endswith("transcript.txt"))
+        assert zip_file.read(transcript_name) == b"hello"
+        audio_info = next(info for info in zip_file.infolist() if info.filename.endswith("lecture.wav"))
+        assert audio_info.compress_type == ZIP_STORED
+        prompt_manifest = next(name for name in names if name.endswith("prompt_manifest.json"))
+        assert "exported_at" in json.loads(zip_file.read(prompt_manifest))
+    assert not list(session_dir.glob("exports/*.zip"))
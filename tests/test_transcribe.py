@@ -0,0 +1,176 @@
+import sys
+import threading
+import types
+import wave
+
+import pytest
+
+from studyscribe.services import transcribe
+
+
+def _settings(**overrides):
+    values = {"chunk_seconds": 2, "transcribe_workers": 1, "whisper_compute_type": None}
+    values.update(overrides)
+    return types.SimpleNamespace(**values)
+
+
+def test_chunk_wav_writes_readable_chunks(tmp_path, make_wav_bytes):
+    wav_path = tmp_path / "lecture.wav"
+    frames = bytes(range(256)) * 250
+    wav_path.write_bytes(make_wav_bytes(frame_rate=8000, frames=frames))
+    chunk_paths = transcribe._chunk_wav(wav_path, tmp_path / "chunks", 3)
+    assert [path.name for path in chunk_paths] == ["chunk_000.wav", "chunk_001.wav"]
+    joined = b""
+    for path in chunk_paths:
+        with wave.open(str(path), "rb") as handle:
+            assert (handle.getnchannels(), handle.getsampwidth(), handle.getframerate()) == (1, 2, 8000)
+            joined += handle.readframes(handle.getnframes())
+    assert joined == frames
+
+
+def test_transcribe_feeds_16k_mono_chunks_as_arrays(tmp_path, monkeypatch, make_wav_bytes):
+    np = pytest.importorskip("numpy")
+    session_dir = tmp_path / "session"
+    session_dir.mkdir()
+    wav_path = tmp_path / "lecture.wav"
+    wav_path.write_bytes(make_wav_bytes(frames=b"\x00\x40" * 16000 * 5))
+    inputs = []
+
+    class FakeModel:
+        def transcribe(self, audio):
+            inputs.append(audio)
+            return [types.SimpleNamespace(start=0.0, end=1.0, text=" hi ")], None
+
+    monkeypatch.setattr(transcribe, "_load_model", lambda workers, compute_type: FakeModel())
+    monkeypatch.setattr(transcribe, "get_settings", _settings)
+    transcribe.transcribe_audio(wav_path, session_dir)
+
+    assert [len(samples) for samples in inputs] == [32000, 32000, 16000]
+    assert all(isinstance(samples, np.ndarray) and samples.dtype == np.float32 for samples in inputs)
+    assert inputs[0][0] == pytest.approx(0.5)
+    assert not (session_dir / "work" / "chunks").exists()
+    segments = transcribe.load_transcript(session_dir / "transcript" / "transcript.json")
+    assert [seg["start"] for seg in segments] == [0.0, 2.0, 4.0]
+
+
+def test_transcribe_chunks_keeps_order_with_workers():
+    release = threading.Event()
+
+    class FakeModel:
+        def transcribe(self, chunk):
+            if chunk == 0:
+                # The first chunk finishes last; results must still come back in order.
+                release.wait(timeout=5)
+            else:
+                release.set()
+            return iter([chunk]), None
+
+    chunks = [(index * 10.0, index) for index in range(5)]
+    results = list(transcribe._transcribe_chunks(FakeModel(), chunks, workers=3))
+    assert results == [(index * 10.0, [index]) for index in range(5)]
+
+
+def test_whisper_model_is_loaded_once_per_worker_count(monkeypatch):
+    created = []
+
+    class FakeWhisperModel:
+        def __init__(self, name, device, compute_type, cpu_threads, num_workers):
+            created.append((device, compute_type, num_workers))
+
+    monkeypatch.setitem(sys.modules, "faster_whisper", types.SimpleNamespace(WhisperModel=FakeWhisperModel))
+    monkeypatch.setattr(transcribe, "_detect_compute_type", lambda: ("cpu", "int8"))
+    transcribe.reset_model()
+    try:
+        first = transcribe._load_model(1)
+        assert transcribe._load_model(1) is first
+        assert transcribe._load_model(2) is not first
+        assert transcribe._load_model(2, "float32") is not first
+        assert created == [("cpu", "int8", 1), ("cpu", "int8", 2), ("cpu", "float32", 2)]
+    finally:
+        transcribe.reset_model()
+
+
+def test_ensure_wav_converts_to_16k_mono_pcm(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(transcribe.shutil, "which", lambda name: "/usr/bin/ffmpeg")
+    monkeypatch.setattr(transcribe.subprocess, "run", lambda command, **kwargs: calls.append((command, kwargs)))
+    output = transcribe._ensure_wav(tmp_path / "lecture.mp3", tmp_path / "work")
+    command, kwargs = calls[0]
+    assert output == tmp_path / "work" / "lecture.wav"
+    assert command[:2] == ["ffmpeg", "-nostdin"]
+    assert command[-7:] == ["-ac", "1", "-ar", "16000", "-c:a", "pcm_s16le", str(output)]
+    assert kwargs["stdout"] is transcribe.subprocess.DEVNULL
+
+
+def test_ensure_wav_only_converts_wavs_in_other_layouts(tmp_path, monkeypatch, make_wav_bytes):
+    calls = []
+    monkeypatch.setattr(transcribe.shutil, "which", lambda name: "/usr/bin/ffmpeg")
+    monkeypatch.setattr(transcribe.subprocess, "run", lambda command, **kwargs: calls.append(command))
+    (tmp_path / "ready.wav").write_bytes(make_wav_bytes())
+    (tmp_path / "stereo.wav").write_bytes(make_wav_bytes(frame_rate=44100, channels=2))
+    assert transcribe._ensure_wav(tmp_path / "ready.wav", tmp_path / "work") == tmp_path / "ready.wav"
+    assert calls == []
+    assert transcribe._ensure_wav(tmp_path / "stereo.wav", tmp_path / "work") == tmp_path / "work" / "stereo.wav"
+    assert len(calls) == 1
+
+
+def test_in_memory_chunks_split_at_nearby_silence(tmp_path, make_wav_bytes):
+    np = pytest.importorskip("numpy")
+    samples = np.full(16000 * 5, 8000, dtype="<i2")
+    samples[::2] = -8000
+    samples[int(16000 * 2.6) : int(16000 * 2.7)] = 0
+    wav_path = tmp_path / "lecture.wav"
+    wav_path.write_bytes(make_wav_bytes(frames=samples.tobytes()))
+
+    chunks = list(transcribe._iter_wav_samples(wav_path, 2, 3))
+    offsets = [offset for offset, _ in chunks]
+    assert len(chunks) == 3
+    assert offsets[0] == 0.0
+    assert 2.6 <= offsets[1] <= 2.7
+    assert offsets[2] == 4.0
+    assert sum(len(chunk) for _, chunk in chunks) == len(samples)
+
+
+def test_transcribe_coalesces_back_to_back_chunk_progress(tmp_path, monkeypatch, make_wav_bytes):
+    session_dir = tmp_path / "session"
+    session_dir.mkdir()
+    wav_path = tmp_path / "lecture.wav"
+    wav_path.write_bytes(make_wav_bytes(duration_seconds=4))
+    clock = iter([0.0, 0.1, 0.2, 0.3])
+
+    class FakeModel:
+        def transcribe(self, audio):
+            return [], None
+
+    monkeypatch.setattr(transcribe, "_load_model", lambda workers, compute_type: FakeModel())
+    monkeypatch.setattr(transcribe, "_in_memory_chunk_count", lambda path, seconds: None)
+    monkeypatch.setattr(transcribe, "time", types.SimpleNamespace(monotonic=lambda: next(clock)))
+    monkeypatch.setattr(transcribe, "get_settings", lambda: _settings(chunk_seconds=1))
+    updates = []
+    transcribe.transcribe_audio(wav_path, session_dir, progress_cb=lambda progress, message: updates.append(progress))
+    assert updates == [0, 75, 100]
+
+
+def test_write_json_records_replaces_the_file_atomically(tmp_path):
+    path = tmp_path / "chunks.json"
+    path.write_bytes(b'[\n{"id":0}\n]\n')
+    original_inode = path.stat().st_ino
+
+    def records():
+        yield {"id": 1}
+        # Mid-stream, the old file is still whole and no partial write is visible.
+        assert path.read_bytes() == b'[\n{"id":0}\n]\n'
+        yield {"id": 2}
+
+    transcribe._write_json_records(path, records())
+    assert transcribe.load_transcript(path) == [{"id": 1}, {"id": 2}]
+    assert path.stat().st_ino != original_inode
+
+    def failing_records():
+        yield {"id": 3}
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        transcribe._write_json_records(path, failing_records())
+    assert transcribe.load_transcript(path) == [{"id": 1}, {"id": 2}]
+    assert [entry.name for entry in tmp_path.iterdir()] == ["chunks.json"]